@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Control de admisión para las rutas de búsqueda
+Un limitador de concurrencia con una cola de espera acotada: cuando la cola
+está llena, o una petición no consigue plaza antes de su plazo, se rechaza
+al momento con 503 y Retry-After en vez de acumular trabajo. Además cada
+cliente tiene un token bucket; si lo agota recibe 429. El cliente es su
+clave de API solo si es una de las configuradas: una clave inventada no
+da un bucket nuevo, cuenta como la IP de quien la envía.
+Las rutas baratas (/health, /aeropuertos, /metrics) no pasan por aquí, así
+que el servicio sigue respondiendo a su capacidad en lugar de caerse.
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Iterable, Optional, Sequence, Tuple
+
+import metricas
+
+
+class ConcurrencyLimiter:
+    """Semáforo con cola FIFO acotada y plazo máximo de espera"""
+
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[Tuple[float, asyncio.Future]] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """Ocupa una plaza; devuelve None o el motivo del rechazo ('cola_llena', 'plazo')"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "cola_llena"
+
+        loop = asyncio.get_running_loop()
+        waiter = (loop.time() + self.queue_timeout, loop.create_future())
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter[1]}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if waiter[1].done() and not waiter[1].cancelled():
+            return None
+        self._abandon(waiter)
+        return "plazo"
+
+    def _abandon(self, waiter: Tuple[float, asyncio.Future]):
+        # Si la plaza llegó justo al rendirse, se devuelve; si no, se sale de la cola
+        if waiter[1].cancelled():
+            return
+        if waiter[1].done():
+            self.release()
+        else:
+            waiter[1].cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self):
+        """Libera una plaza y se la pasa al primer waiter que aún llega a tiempo"""
+        now = asyncio.get_running_loop().time()
+        while self._waiters:
+            deadline, future = self._waiters.popleft()
+            if future.done():
+                continue
+            if deadline <= now:
+                # Su plazo ya venció: la plaza no le sirve, se rechazará con 503
+                future.cancel()
+                continue
+            future.set_result(True)
+            return
+        self.active -= 1
+
+
+class RateLimiter:
+    """Token buckets por cliente; los clientes inactivos se descartan en orden LRU"""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def check(self, client: str, now: Optional[float] = None) -> float:
+        """Consume un token; devuelve 0 si se admite o los segundos hasta el siguiente token"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+
+class AdmissionControl:
+    """Configuración y estado compartidos por el middleware y /api-info"""
+
+    def __init__(self, limiter: ConcurrencyLimiter, rate_limiter: RateLimiter, paths: Sequence[str],
+                 retry_after: float = 1, trust_proxy: bool = False, api_keys: Iterable[str] = ()):
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+        self.paths = tuple(paths)
+        self.retry_after = retry_after
+        self.trust_proxy = trust_proxy
+        self.api_keys = frozenset(api_keys)
+
+    def protects(self, path: str) -> bool:
+        return path.startswith(self.paths)
+
+    def client_key(self, scope) -> str:
+        """Clave de API si es una de las configuradas; si no, la IP del cliente"""
+        headers = dict(scope.get("headers") or [])
+        api_key = headers.get(b"x-api-key")
+        if api_key and api_key.decode("latin-1") in self.api_keys:
+            return "key:" + api_key.decode("latin-1")
+        forwarded = headers.get(b"x-forwarded-for")
+        if self.trust_proxy and forwarded:
+            return "ip:" + forwarded.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "desconocido")
+
+    def stats(self) -> dict:
+        """Estado para /api-info"""
+        return {
+            "paths": list(self.paths),
+            "max_concurrency": self.limiter.limit,
+            "active": self.limiter.active,
+            "queued": self.limiter.queued,
+            "queue_size": self.limiter.queue_size,
+            "queue_timeout_seconds": self.limiter.queue_timeout,
+            "rate_per_second": self.rate_limiter.rate,
+            "burst": self.rate_limiter.burst,
+            "tracked_clients": len(self.rate_limiter),
+            "api_keys": len(self.api_keys),
+        }
+
+
+async def _reject(send, status: int, retry_after: float, detail: str, reason: str):
+    metricas.ADMISSION_REJECTED.inc(reason)
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI que aplica el control de admisión a las rutas protegidas"""
+
+    def __init__(self, app, control: AdmissionControl):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        control = self.control
+        if scope["type"] != "http" or not control.protects(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        wait = control.rate_limiter.check(control.client_key(scope))
+        if wait:
+            await _reject(send, 429, wait, "Demasiadas peticiones: espera antes de reintentar", "cliente")
+            return
+
+        started = time.perf_counter()
+        reason = await control.limiter.acquire()
+        if reason is not None:
+            await _reject(send, 503, control.retry_after, "Servicio saturado: reintenta en unos segundos", reason)
+            return
+        metricas.ADMISSION_WAIT.observe(time.perf_counter() - started)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            control.limiter.release()
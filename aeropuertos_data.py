@@ -1,117 +1,208 @@
 #!/usr/bin/env python3
 """
 Base de datos completa de aeropuertos mundiales
+Las tablas se leen de los ficheros de datos/ la primera vez que se usan y
+se guardan en columnas: una lista de códigos IATA con un índice código ->
+id, coordenadas en arrays de NumPy y país/región codificados como
+categorías. Solo se crea un dict por aeropuerto cuando alguien lo pide.
+
+Con la tabla completa (decenas de miles de aeropuertos) conviene compilar
+el CSV a un índice compacto: columnas .npy que se abren con memmap y los
+nombres y ciudades en un único bloque UTF-8 con sus offsets. Si el índice
+existe y corresponde al CSV actual se carga él en lugar del CSV.
+
+Para regenerar datos/aeropuertos.csv a partir del listado público de
+OurAirports (https://ourairports.com/data/) y compilar su índice:
+    python aeropuertos_data.py --importar airports.csv --paises countries.csv
+Para compilar solo el índice del CSV que ya existe:
+    python aeropuertos_data.py --compilar
 """
 
-AEROPUERTOS_MUNDIALES = {
-    # EUROPA
-    "MAD": {"nombre": "Madrid-Barajas", "ciudad": "Madrid", "pais": "España", "region": "Europa"},
-    "BCN": {"nombre": "Barcelona-El Prat", "ciudad": "Barcelona", "pais": "España", "region": "Europa"},
-    "CDG": {"nombre": "Paris Charles de Gaulle", "ciudad": "París", "pais": "Francia", "region": "Europa"},
-    "ORY": {"nombre": "Paris Orly", "ciudad": "París", "pais": "Francia", "region": "Europa"},
-    "LHR": {"nombre": "London Heathrow", "ciudad": "Londres", "pais": "Reino Unido", "region": "Europa"},
-    "LGW": {"nombre": "London Gatwick", "ciudad": "Londres", "pais": "Reino Unido", "region": "Europa"},
-    "STN": {"nombre": "London Stansted", "ciudad": "Londres", "pais": "Reino Unido", "region": "Europa"},
-    "FCO": {"nombre": "Rome Fiumicino", "ciudad": "Roma", "pais": "Italia", "region": "Europa"},
-    "BER": {"nombre": "Berlin Brandenburg", "ciudad": "Berlín", "pais": "Alemania", "region": "Europa"},
-    "AMS": {"nombre": "Amsterdam Schiphol", "ciudad": "Ámsterdam", "pais": "Países Bajos", "region": "Europa"},
-    "MXP": {"nombre": "Milan Malpensa", "ciudad": "Milán", "pais": "Italia", "region": "Europa"},
-    "ZUR": {"nombre": "Zurich Airport", "ciudad": "Zúrich", "pais": "Suiza", "region": "Europa"},
-    "VIE": {"nombre": "Vienna International", "ciudad": "Viena", "pais": "Austria", "region": "Europa"},
-    "FRA": {"nombre": "Frankfurt Airport", "ciudad": "Frankfurt", "pais": "Alemania", "region": "Europa"},
-    "MUC": {"nombre": "Munich Airport", "ciudad": "Múnich", "pais": "Alemania", "region": "Europa"},
-    "CPH": {"nombre": "Copenhagen Kastrup", "ciudad": "Copenhague", "pais": "Dinamarca", "region": "Europa"},
-    "ARN": {"nombre": "Stockholm Arlanda", "ciudad": "Estocolmo", "pais": "Suecia", "region": "Europa"},
-    "OSL": {"nombre": "Oslo Gardermoen", "ciudad": "Oslo", "pais": "Noruega", "region": "Europa"},
-    "HEL": {"nombre": "Helsinki Vantaa", "ciudad": "Helsinki", "pais": "Finlandia", "region": "Europa"},
-    "DUB": {"nombre": "Dublin Airport", "ciudad": "Dublín", "pais": "Irlanda", "region": "Europa"},
-    "LIS": {"nombre": "Lisbon Portela", "ciudad": "Lisboa", "pais": "Portugal", "region": "Europa"},
-    "ATH": {"nombre": "Athens International", "ciudad": "Atenas", "pais": "Grecia", "region": "Europa"},
-    "IST": {"nombre": "Istanbul Airport", "ciudad": "Estambul", "pais": "Turquía", "region": "Europa"},
-    
-    # AMÉRICA DEL NORTE
-    "JFK": {"nombre": "John F. Kennedy", "ciudad": "Nueva York", "pais": "Estados Unidos", "region": "América del Norte"},
-    "LAX": {"nombre": "Los Angeles International", "ciudad": "Los Ángeles", "pais": "Estados Unidos", "region": "América del Norte"},
-    "ORD": {"nombre": "Chicago O'Hare", "ciudad": "Chicago", "pais": "Estados Unidos", "region": "América del Norte"},
-    "MIA": {"nombre": "Miami International", "ciudad": "Miami", "pais": "Estados Unidos", "region": "América del Norte"},
-    "ATL": {"nombre": "Atlanta Hartsfield-Jackson", "ciudad": "Atlanta", "pais": "Estados Unidos", "region": "América del Norte"},
-    "DFW": {"nombre": "Dallas Fort Worth", "ciudad": "Dallas", "pais": "Estados Unidos", "region": "América del Norte"},
-    "DEN": {"nombre": "Denver International", "ciudad": "Denver", "pais": "Estados Unidos", "region": "América del Norte"},
-    "SEA": {"nombre": "Seattle-Tacoma International", "ciudad": "Seattle", "pais": "Estados Unidos", "region": "América del Norte"},
-    "BOS": {"nombre": "Boston Logan International", "ciudad": "Boston", "pais": "Estados Unidos", "region": "América del Norte"},
-    "SFO": {"nombre": "San Francisco International", "ciudad": "San Francisco", "pais": "Estados Unidos", "region": "América del Norte"},
-    "LAS": {"nombre": "Las Vegas McCarran", "ciudad": "Las Vegas", "pais": "Estados Unidos", "region": "América del Norte"},
-    "LGA": {"nombre": "LaGuardia", "ciudad": "Nueva York", "pais": "Estados Unidos", "region": "América del Norte"},
-    "YVR": {"nombre": "Vancouver International", "ciudad": "Vancouver", "pais": "Canadá", "region": "América del Norte"},
-    "YYZ": {"nombre": "Toronto Pearson International", "ciudad": "Toronto", "pais": "Canadá", "region": "América del Norte"},
-    "MEX": {"nombre": "Mexico City International", "ciudad": "Ciudad de México", "pais": "México", "region": "América del Norte"},
-    "GDL": {"nombre": "Guadalajara Don Miguel", "ciudad": "Guadalajara", "pais": "México", "region": "América del Norte"},
-    "TIJ": {"nombre": "Tijuana Rodriguez", "ciudad": "Tijuana", "pais": "México", "region": "América del Norte"},
-    
-    # AMÉRICA DEL SUR
-    "SCL": {"nombre": "Santiago Arturo Merino Benítez", "ciudad": "Santiago", "pais": "Chile", "region": "América del Sur"},
-    "GRU": {"nombre": "São Paulo Guarulhos", "ciudad": "São Paulo", "pais": "Brasil", "region": "América del Sur"},
-    "EZE": {"nombre": "Buenos Aires Ezeiza", "ciudad": "Buenos Aires", "pais": "Argentina", "region": "América del Sur"},
-    "BOG": {"nombre": "Bogotá El Dorado", "ciudad": "Bogotá", "pais": "Colombia", "region": "América del Sur"},
-    "LIM": {"nombre": "Jorge Chavez International", "ciudad": "Lima", "pais": "Perú", "region": "América del Sur"},
-    
-    # ASIA
-    "BOM": {"nombre": "Mumbai Chhatrapati Shivaji", "ciudad": "Mumbai", "pais": "India", "region": "Asia"},
-    "DEL": {"nombre": "Delhi Indira Gandhi", "ciudad": "Nueva Delhi", "pais": "India", "region": "Asia"},
-    "BKK": {"nombre": "Bangkok Suvarnabhumi", "ciudad": "Bangkok", "pais": "Tailandia", "region": "Asia"},
-    "SIN": {"nombre": "Singapore Changi", "ciudad": "Singapur", "pais": "Singapur", "region": "Asia"},
-    "HKG": {"nombre": "Hong Kong International", "ciudad": "Hong Kong", "pais": "Hong Kong", "region": "Asia"},
-    "TPE": {"nombre": "Taiwan Taoyuan", "ciudad": "Taipéi", "pais": "Taiwán", "region": "Asia"},
-    "ICN": {"nombre": "Seoul Incheon International", "ciudad": "Seúl", "pais": "Corea del Sur", "region": "Asia"},
-    "NRT": {"nombre": "Tokyo Narita International", "ciudad": "Tokio", "pais": "Japón", "region": "Asia"},
-    "HND": {"nombre": "Tokyo Haneda", "ciudad": "Tokio", "pais": "Japón", "region": "Asia"},
-    "PVG": {"nombre": "Shanghai Pudong International", "ciudad": "Shanghai", "pais": "China", "region": "Asia"},
-    "PEK": {"nombre": "Beijing Capital International", "ciudad": "Pekín", "pais": "China", "region": "Asia"},
-    "CAN": {"nombre": "Guangzhou Baiyun International", "ciudad": "Cantón", "pais": "China", "region": "Asia"},
-    "DXB": {"nombre": "Dubai International", "ciudad": "Dubái", "pais": "Emiratos Árabes Unidos", "region": "Asia"},
-    "DOH": {"nombre": "Doha Hamad International", "ciudad": "Doha", "pais": "Catar", "region": "Asia"},
-    
-    # ÁFRICA
-    "JNB": {"nombre": "Johannesburg O.R. Tambo", "ciudad": "Johannesburgo", "pais": "Sudáfrica", "region": "África"},
-    "CAI": {"nombre": "Cairo International", "ciudad": "El Cairo", "pais": "Egipto", "region": "África"},
-    "CMN": {"nombre": "Casablanca Mohammed V", "ciudad": "Casablanca", "pais": "Marruecos", "region": "África"},
-    "DUR": {"nombre": "King Shaka International", "ciudad": "Durban", "pais": "Sudáfrica", "region": "África"},
-    "ADD": {"nombre": "Addis Ababa Bole", "ciudad": "Adís Abeba", "pais": "Etiopía", "region": "África"},
-    "NBO": {"nombre": "Nairobi Jomo Kenyatta", "ciudad": "Nairobi", "pais": "Kenia", "region": "África"},
-    
-    # OCEANÍA
-    "SYD": {"nombre": "Sydney Kingsford Smith", "ciudad": "Sídney", "pais": "Australia", "region": "Oceanía"},
-    "MEL": {"nombre": "Melbourne International", "ciudad": "Melbourne", "pais": "Australia", "region": "Oceanía"},
-    "AKL": {"nombre": "Auckland International", "ciudad": "Auckland", "pais": "Nueva Zelanda", "region": "Oceanía"},
-    "WLG": {"nombre": "Wellington International", "ciudad": "Wellington", "pais": "Nueva Zelanda", "region": "Oceanía"},
-    
-    # MEDIO ORIENTE
-    "DOH": {"nombre": "Doha Hamad International", "ciudad": "Doha", "pais": "Catar", "region": "Medio Oriente"},
-    "DXB": {"nombre": "Dubai International", "ciudad": "Dubái", "pais": "Emiratos Árabes Unidos", "region": "Medio Oriente"},
-    "ABD": {"nombre": "Abha", "ciudad": "Abha", "pais": "Arabia Saudí", "region": "Medio Oriente"},
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+DATA_DIR = os.getenv('AIRPORTS_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datos'))
+AIRPORTS_FILE = os.path.join(DATA_DIR, 'aeropuertos.csv')
+AIRPORTS_INDEX_DIR = os.path.join(DATA_DIR, 'aeropuertos_indice')
+AIRLINES_FILE = os.path.join(DATA_DIR, 'aerolineas.csv')
+
+AIRPORT_COLUMNS = ['iata', 'nombre', 'ciudad', 'pais', 'region', 'lat', 'lon']
+
+# Continentes de OurAirports -> regiones de la API
+CONTINENT_REGIONS = {
+    'EU': 'Europa',
+    'NA': 'América del Norte',
+    'SA': 'América del Sur',
+    'AS': 'Asia',
+    'AF': 'África',
+    'OC': 'Oceanía',
+    'AN': 'Antártida',
 }
+MIDDLE_EAST = {'AE', 'BH', 'IL', 'IQ', 'IR', 'JO', 'KW', 'LB', 'OM', 'PS', 'QA', 'SA', 'SY', 'YE'}
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TextColumn(Sequence):
+    """Cadenas guardadas en un bloque UTF-8 con offsets; se decodifican al pedirlas"""
+
+    def __init__(self, blob: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+        self._blob = blob
+        self._starts = starts
+        self._ends = ends
+
+    def __getitem__(self, i: int) -> str:
+        return self._blob[self._starts[i]:self._ends[i]].tobytes().decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+
+class AirportTable(Mapping):
+    """Tabla de aeropuertos por código IATA en formato columnar y de carga perezosa"""
+
+    def __init__(self, path: str, index_dir: Optional[str] = None):
+        self.path = path
+        self.index_dir = index_dir
+        self._loaded = False
+
+    def _load(self):
+        if self.index_dir and self._load_index():
+            self._loaded = True
+            return
+        self._load_csv()
+        self._loaded = True
+
+    def _load_index(self) -> bool:
+        """Carga el índice compilado; False si no existe o es de otra versión del CSV"""
+        try:
+            with open(os.path.join(self.index_dir, 'origen.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return False
+        if meta.get('csv_sha256') != _file_digest(self.path):
+            print(f"El índice {self.index_dir} no corresponde a {self.path}: se lee el CSV")
+            return False
+
+        def column(name: str) -> np.ndarray:
+            return np.load(os.path.join(self.index_dir, f'{name}.npy'), mmap_mode='r')
+
+        codes = column('codigos').astype(str).tolist()
+        self.codes = [sys.intern(code) for code in codes]
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        offsets = column('textos_inicios')
+        blob = np.memmap(os.path.join(self.index_dir, 'textos.bin'), dtype=np.uint8, mode='r') \
+            if offsets[-1] else np.zeros(0, dtype=np.uint8)
+        self.names = TextColumn(blob, offsets[0:-1:2], offsets[1::2])
+        self.cities = TextColumn(blob, offsets[1::2], offsets[2::2])
+        self.categories = meta['categorias']
+        self.country = column('pais')
+        self.region = column('region')
+        self.lat = column('lat')
+        self.lon = column('lon')
+        return True
+
+    def _load_csv(self):
+        codes: List[str] = []
+        names: List[str] = []
+        cities: List[str] = []
+        countries: List[int] = []
+        regions: List[int] = []
+        lat: List[float] = []
+        lon: List[float] = []
+        categories: Dict[str, int] = {}
+
+        def category(value: str) -> int:
+            return categories.setdefault(sys.intern(value), len(categories))
+
+        index: Dict[str, int] = {}
+        with open(self.path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                code = row['iata'].strip().upper()
+                if code in index:
+                    print(f"Aeropuerto duplicado en {self.path}: {code}")
+                    continue
+                index[sys.intern(code)] = len(codes)
+                codes.append(code)
+                names.append(row['nombre'])
+                cities.append(sys.intern(row['ciudad']))
+                countries.append(category(row['pais']))
+                regions.append(category(row['region']))
+                lat.append(float(row['lat']))
+                lon.append(float(row['lon']))
+
+        self.codes = codes
+        self.index = index
+        self.names = names
+        self.cities = cities
+        self.categories = list(categories)
+        self.country = np.array(countries, dtype=np.uint16)
+        self.region = np.array(regions, dtype=np.uint16)
+        self.lat = np.array(lat, dtype=np.float64)
+        self.lon = np.array(lon, dtype=np.float64)
+
+    def __getattr__(self, name):
+        # Las columnas solo existen tras la primera carga
+        if name.startswith('_') or self._loaded:
+            raise AttributeError(name)
+        self._load()
+        return getattr(self, name)
+
+    def id(self, code: str):
+        """Id entero del aeropuerto, o None si no está en la tabla"""
+        return self.index.get(code)
+
+    def record(self, i: int) -> dict:
+        """Registro del aeropuerto con id `i`"""
+        return {
+            "nombre": self.names[i],
+            "ciudad": self.cities[i],
+            "pais": self.categories[self.country[i]],
+            "region": self.categories[self.region[i]],
+            "lat": float(self.lat[i]),
+            "lon": float(self.lon[i]),
+        }
+
+    def __getitem__(self, code: str) -> dict:
+        i = self.index.get(code)
+        if i is None:
+            raise KeyError(code)
+        return self.record(i)
+
+    def __contains__(self, code) -> bool:
+        return code in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def load_airlines(path: str) -> Dict[str, dict]:
+    """Aerolíneas por nombre"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['nombre']: {"codigo": row['codigo'], "pais": row['pais']} for row in csv.DictReader(f)}
+
+
+AEROPUERTOS_MUNDIALES = AirportTable(AIRPORTS_FILE, AIRPORTS_INDEX_DIR)
 
 # Aerolíneas principales
-AEROLINEAS = {
-    "Iberia": {"codigo": "IB", "pais": "España"},
-    "British Airways": {"codigo": "BA", "pais": "Reino Unido"},
-    "Air France": {"codigo": "AF", "pais": "Francia"},
-    "Lufthansa": {"codigo": "LH", "pais": "Alemania"},
-    "KLM": {"codigo": "KL", "pais": "Países Bajos"},
-    "Swiss": {"codigo": "LX", "pais": "Suiza"},
-    "Austrian Airlines": {"codigo": "OS", "pais": "Austria"},
-    "American Airlines": {"codigo": "AA", "pais": "Estados Unidos"},
-    "Delta Airlines": {"codigo": "DL", "pais": "Estados Unidos"},
-    "United Airlines": {"codigo": "UA", "pais": "Estados Unidos"},
-    "Emirates": {"codigo": "EK", "pais": "Emiratos Árabes Unidos"},
-    "Qatar Airways": {"codigo": "QR", "pais": "Catar"},
-    "Etihad": {"codigo": "EY", "pais": "Emiratos Árabes Unidos"},
-    "Singapore Airlines": {"codigo": "SQ", "pais": "Singapur"},
-    "Turkish Airlines": {"codigo": "TK", "pais": "Turquía"},
-    "Vueling": {"codigo": "VY", "pais": "España"},
-    "Ryanair": {"codigo": "FR", "pais": "Irlanda"},
-    "EasyJet": {"codigo": "U2", "pais": "Reino Unido"},
-}
+AEROLINEAS = load_airlines(AIRLINES_FILE)
 
 # Sitios de compra
 SITIOS_COMPRA = {
@@ -135,4 +226,99 @@ def get_aerolineas():
 
 def get_sitios_compra():
     """Obtener sitios de compra"""
-    return SITIOS_COMPRA
\ No newline at end of file
+    return SITIOS_COMPRA
+
+
+def import_ourairports(airports_csv: str, countries_csv: str, output: str):
+    """Convierte airports.csv de OurAirports al formato de datos/aeropuertos.csv
+
+    Solo entran los aeropuertos con código IATA, que es la clave de toda la
+    API. Las entradas que ya estaban en `output` se conservan tal cual
+    (nombres y países en español) y el resto se añade a continuación.
+    """
+    country_names = {}
+    if countries_csv:
+        with open(countries_csv, newline='', encoding='utf-8') as f:
+            country_names = {row['code']: row['name'] for row in csv.DictReader(f)}
+
+    rows: Dict[str, list] = {}
+    if os.path.exists(output):
+        with open(output, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                rows.setdefault(row['iata'], [row[column] for column in AIRPORT_COLUMNS])
+    curated = len(rows)
+
+    with open(airports_csv, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            code = (row.get('iata_code') or '').strip().upper()
+            if len(code) != 3 or not code.isalpha() or code in rows:
+                continue
+            if row['type'] not in ('large_airport', 'medium_airport', 'small_airport', 'seaplane_base'):
+                continue
+            country = row['iso_country']
+            region = 'Medio Oriente' if country in MIDDLE_EAST else CONTINENT_REGIONS.get(row['continent'], 'Europa')
+            rows[code] = [
+                code, row['name'], row['municipality'] or row['name'], country_names.get(country, country),
+                region, round(float(row['latitude_deg']), 4), round(float(row['longitude_deg']), 4),
+            ]
+
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(AIRPORT_COLUMNS)
+        writer.writerows(rows.values())
+    print(f"{len(rows)} aeropuertos escritos en {output} ({curated} conservados, {len(rows) - curated} importados)")
+
+
+def compile_index(airports_csv: str, index_dir: str):
+    """Escribe el índice compacto de `airports_csv` en `index_dir`
+
+    Se escribe en un directorio temporal y se renombra al final, así que un
+    worker que arranque a la vez ve el índice anterior o el nuevo, nunca uno a medias.
+    """
+    table = AirportTable(airports_csv)
+    table._load_csv()
+    encoded = [value.encode('utf-8') for pair in zip(table.names, table.cities) for value in pair]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+
+    tmp = index_dir + '.tmp'
+    if os.path.isdir(tmp):
+        for name in os.listdir(tmp):
+            os.remove(os.path.join(tmp, name))
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, 'codigos.npy'), np.array([code.encode('utf-8') for code in table.codes], dtype=bytes))
+    np.save(os.path.join(tmp, 'lat.npy'), table.lat)
+    np.save(os.path.join(tmp, 'lon.npy'), table.lon)
+    np.save(os.path.join(tmp, 'pais.npy'), table.country)
+    np.save(os.path.join(tmp, 'region.npy'), table.region)
+    np.save(os.path.join(tmp, 'textos_inicios.npy'), offsets)
+    with open(os.path.join(tmp, 'textos.bin'), 'wb') as f:
+        f.write(b''.join(encoded))
+    with open(os.path.join(tmp, 'origen.json'), 'w', encoding='utf-8') as f:
+        json.dump({'csv_sha256': _file_digest(airports_csv), 'aeropuertos': len(table.codes),
+                   'categorias': table.categories}, f, ensure_ascii=False)
+
+    old = index_dir + '.old'
+    if os.path.isdir(index_dir):
+        os.replace(index_dir, old)
+    os.replace(tmp, index_dir)
+    if os.path.isdir(old):
+        for name in os.listdir(old):
+            os.remove(os.path.join(old, name))
+        os.rmdir(old)
+    print(f"Índice de {len(table.codes)} aeropuertos escrito en {index_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa el listado de aeropuertos de OurAirports y compila su índice")
+    parser.add_argument("--importar", default="", help="airports.csv de OurAirports")
+    parser.add_argument("--paises", default="", help="countries.csv de OurAirports (nombres de país)")
+    parser.add_argument("--compilar", action="store_true", help="solo compila el índice del CSV existente")
+    parser.add_argument("--salida", default=AIRPORTS_FILE)
+    parser.add_argument("--indice", default="", help="directorio del índice (por defecto junto al CSV)")
+    args = parser.parse_args()
+    if not args.importar and not args.compilar:
+        parser.error("indica --importar airports.csv o --compilar")
+    if args.importar:
+        import_ourairports(args.importar, args.paises, args.salida)
+    compile_index(args.salida, args.indice or os.path.join(os.path.dirname(os.path.abspath(args.salida)), 'aeropuertos_indice'))
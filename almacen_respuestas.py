@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Almacén persistente en SQLite de respuestas de AviationStack
+Guarda los payloads crudos con su fecha de descarga y el contador mensual
+de peticiones, para que un reinicio no pierda lo que ya se ha pagado, y
+las búsquedas por ruta y día de todos los workers para la precarga.
+Las escrituras se agrupan en un hilo de fondo con journal WAL.
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from escritura_lotes import drain_batches
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS respuestas (
+    dep_iata TEXT NOT NULL,
+    arr_iata TEXT NOT NULL,
+    flight_date TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (dep_iata, arr_iata, flight_date)
+);
+CREATE INDEX IF NOT EXISTS idx_respuestas_fetched_at ON respuestas (fetched_at);
+CREATE TABLE IF NOT EXISTS cuota (
+    mes TEXT PRIMARY KEY,
+    request_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS busquedas (
+    dia TEXT NOT NULL,
+    dep_iata TEXT NOT NULL,
+    arr_iata TEXT NOT NULL,
+    busquedas INTEGER NOT NULL,
+    PRIMARY KEY (dia, dep_iata, arr_iata)
+);
+"""
+
+
+class ResponseStore:
+    """Almacén SQLite con escritura diferida por lotes"""
+
+    def __init__(self, path: str, max_age_days: float = 7, flush_interval: float = 1.0):
+        self.path = path
+        self.max_age_days = max_age_days
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._local = threading.local()
+        self.writes = 0
+
+    def _connect(self, isolation_level: Optional[str] = "") -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=isolation_level)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def open(self):
+        """Crea el esquema, compacta y arranca el hilo escritor"""
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+            self._compact(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._thread = threading.Thread(target=self._run, name="response-store", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Vacía la cola pendiente y detiene el hilo escritor"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def load_responses(self, flight_date: str, max_age: float) -> List[Tuple[Tuple[str, str, str], float, List[dict]]]:
+        """Lee las respuestas de una fecha descargadas hace menos de `max_age` segundos"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT dep_iata, arr_iata, flight_date, fetched_at, payload FROM respuestas "
+                "WHERE flight_date = ? AND fetched_at >= ?",
+                (flight_date, time.time() - max_age)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [((dep, arr, day), fetched_at, json.loads(payload)) for dep, arr, day, fetched_at, payload in rows]
+
+    def load_request_count(self, month: str) -> int:
+        """Contador de peticiones guardado para el mes `YYYY-MM`"""
+        row = self._shared_connection().execute("SELECT request_count FROM cuota WHERE mes = ?", (month,)).fetchone()
+        return row[0] if row else 0
+
+    def load_popularity(self, today: str, days: int = 7) -> Dict[Tuple[str, str], float]:
+        """Búsquedas por ruta de los últimos `days` días; cada día pesa la mitad que el siguiente"""
+        first = (date.fromisoformat(today) - timedelta(days=days - 1)).isoformat()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT dia, dep_iata, arr_iata, busquedas FROM busquedas WHERE dia >= ? AND dia <= ?",
+                (first, today)
+            ).fetchall()
+        finally:
+            conn.close()
+        end = date.fromisoformat(today)
+        popularity: Dict[Tuple[str, str], float] = Counter()
+        for day, dep, arr, count in rows:
+            popularity[(dep, arr)] += count / 2 ** (end - date.fromisoformat(day)).days
+        return popularity
+
+    def get_response(self, key: Tuple[str, str, str], max_age: float) -> Optional[List[dict]]:
+        """Payload de una ruta si otro proceso lo descargó hace menos de `max_age` segundos"""
+        row = self._shared_connection().execute(
+            "SELECT payload FROM respuestas WHERE dep_iata = ? AND arr_iata = ? AND flight_date = ? "
+            "AND fetched_at >= ?",
+            (*key, time.time() - max_age)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def reserve_request(self, month: str, limit: int) -> Optional[int]:
+        """Reserva atómicamente una petición de la cuota compartida
+
+        Devuelve el nuevo contador, o None si el límite ya está agotado.
+        """
+        conn = self._shared_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT request_count FROM cuota WHERE mes = ?", (month,)).fetchone()
+            count = row[0] if row else 0
+            if count >= limit:
+                conn.execute("ROLLBACK")
+                return None
+            conn.execute(
+                "INSERT INTO cuota (mes, request_count) VALUES (?, 1) "
+                "ON CONFLICT(mes) DO UPDATE SET request_count = request_count + 1",
+                (month,)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return count + 1
+
+    def _shared_connection(self) -> sqlite3.Connection:
+        # Conexión en autocommit por hilo para lecturas y reservas entre procesos
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect(isolation_level=None)
+        return conn
+
+    def put_response(self, key: Tuple[str, str, str], payload: List[dict]):
+        """Encola un payload crudo para persistirlo"""
+        dep_iata, arr_iata, flight_date = key
+        self._queue.put(("respuesta", (dep_iata, arr_iata, flight_date, time.time(), json.dumps(payload))))
+
+    def put_request_count(self, month: str, count: int):
+        """Encola el contador mensual actualizado"""
+        self._queue.put(("cuota", (month, count)))
+
+    def put_search(self, dep_iata: str, arr_iata: str, day: str):
+        """Encola una búsqueda de la ruta para la popularidad compartida"""
+        self._queue.put(("busqueda", (day, dep_iata, arr_iata)))
+
+    def _compact(self, conn: sqlite3.Connection):
+        cutoff = time.time() - self.max_age_days * 86400
+        conn.execute("DELETE FROM respuestas WHERE fetched_at < ?", (cutoff,))
+        conn.execute("DELETE FROM busquedas WHERE dia < ?", (date.fromtimestamp(cutoff).isoformat(),))
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[str, tuple]]):
+        respuestas = [args for kind, args in batch if kind == "respuesta"]
+        cuotas = [args for kind, args in batch if kind == "cuota"]
+        busquedas = Counter(args for kind, args in batch if kind == "busqueda")
+        with conn:
+            if respuestas:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO respuestas (dep_iata, arr_iata, flight_date, fetched_at, payload) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    respuestas
+                )
+            if cuotas:
+                conn.executemany(
+                    "INSERT INTO cuota (mes, request_count) VALUES (?, ?) "
+                    "ON CONFLICT(mes) DO UPDATE SET request_count = MAX(request_count, excluded.request_count)",
+                    cuotas
+                )
+            if busquedas:
+                conn.executemany(
+                    "INSERT INTO busquedas (dia, dep_iata, arr_iata, busquedas) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(dia, dep_iata, arr_iata) DO UPDATE SET busquedas = busquedas + excluded.busquedas",
+                    [(*key, count) for key, count in busquedas.items()]
+                )
+        self.writes += 1
+
+    def _run(self):
+        conn = self._connect()
+        last_compaction = time.monotonic()
+        try:
+            for batch in drain_batches(self._queue, self.flush_interval):
+                if batch:
+                    try:
+                        self._write_batch(conn, batch)
+                    except sqlite3.Error as e:
+                        print(f"Error al persistir respuestas: {e}")
+                if time.monotonic() - last_compaction > 3600:
+                    with conn:
+                        self._compact(conn)
+                    last_compaction = time.monotonic()
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        """Estado del almacén para /api-info"""
+        return {
+            "path": self.path,
+            "max_age_days": self.max_age_days,
+            "pending_writes": self._queue.qsize(),
+            "batches_written": self.writes,
+        }
@@ -3,34 +3,58 @@ FlightSearch Pro - API v3.0 con Datos Reales
 Integra AviationStack API para vuelos en tiempo real
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-import requests
+from typing import AsyncIterator, List, Optional, Tuple, Type, Union
+import httpx
+import asyncio
+import copy
+import itertools
 import json
 import os
+import time
 from datetime import datetime, timedelta
-import random
-from aeropuertos_data import AEROPUERTOS_MUNDIALES as AEROPUERTOS, AEROLINEAS, SITIOS_COMPRA
+import numpy as np
+from aeropuertos_data import AEROPUERTOS_MUNDIALES as AEROPUERTOS, AEROLINEAS, SITIOS_COMPRA, DATA_DIR
+from cache_rutas import RouteCache
+from almacen_respuestas import ResponseStore
+from historial_precios import FareHistory
+from monedas import BASE_CURRENCY, CurrencyEngine, RateSnapshot, file_provider, url_provider
+import distancias
+import itinerarios
+import metricas
+import panel_salidas
+from resiliencia import CircuitBreaker
+from precarga import Prefetcher
+from suscripciones import FLIGHT_NUMBER, LiveClient, LiveHub
+from simulador import FareSimulator, STREAM_NUMBER, STREAM_SITE, hash_key
+from resultados import SORT_KEYS, ResultFilter, clock_minutes, decode_cursor, encode_cursor, parse_airlines, select_page
+from indice_aeropuertos import AirportIndex
+from catalogo import Catalog
+from ubicaciones import LocationResolver
+from serializacion import FlightRecord, dumps, json_response, model_dict
+from admision import AdmissionControl, AdmissionMiddleware, ConcurrencyLimiter, RateLimiter
 
 # Configuración de la API
 app = FastAPI(title="FlightSearch Pro - Real Data API", version="3.0")
 
-# Configuración CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 # Modelos de datos
 class FlightSearch(BaseModel):
     origen: str
     destino: str
     fecha: str
     adultos: int = 1
+    radio_origen_km: Optional[float] = None
+    radio_destino_km: Optional[float] = None
+
+class Tramo(BaseModel):
+    origen: str
+    destino: str
+    distancia_km: int
+    duracion_min: int
+    conexion_min: int = 0
 
 class Flight(BaseModel):
     origen: str
@@ -42,10 +66,12 @@ class Flight(BaseModel):
     aerolinea: str
     numero_vuelo: str
     duracion: str
+    hora_salida: Optional[str] = None
     escalas: int
     estado: str = "programado"
     link_compra: str = ""
     tipo_busqueda: str = "real"
+    tramos: List[Tramo] = []
 
 class SearchResponse(BaseModel):
     success: bool
@@ -54,10 +80,210 @@ class SearchResponse(BaseModel):
     modo: str
     datos_reales: bool = True
     fecha_busqueda: str
+    aeropuertos_origen: List[str] = []
+    aeropuertos_destino: List[str] = []
+    total_resultados: int = 0
+    siguiente_cursor: Optional[str] = None
+
+class BatchResult(BaseModel):
+    origen: str
+    destino: str
+    fecha: str
+    success: bool
+    estado: str
+    error: Optional[str] = None
+    vuelos: List[Flight] = []
+    total: int = 0
+
+class BatchResponse(BaseModel):
+    success: bool
+    resultados: List[BatchResult]
+    total_busquedas: int
+    rutas_unicas: int
+    fecha_busqueda: str
 
 # Configuración AviationStack
 AVIATIONSTACK_API_KEY = os.getenv('AVIATIONSTACK_API_KEY', 'YOUR_API_KEY_HERE')
-AVIATIONSTACK_BASE_URL = 'https://api.aviationstack.com/v1'
+AVIATIONSTACK_BASE_URL = os.getenv('AVIATIONSTACK_BASE_URL', 'https://api.aviationstack.com/v1')
+
+# Pool de conexiones y tiempos límite (segundos) para las llamadas a AviationStack
+AVIATIONSTACK_CONNECT_TIMEOUT = float(os.getenv('AVIATIONSTACK_CONNECT_TIMEOUT', '3'))
+AVIATIONSTACK_READ_TIMEOUT = float(os.getenv('AVIATIONSTACK_READ_TIMEOUT', '10'))
+AVIATIONSTACK_MAX_CONNECTIONS = int(os.getenv('AVIATIONSTACK_MAX_CONNECTIONS', '20'))
+AVIATIONSTACK_MAX_KEEPALIVE = int(os.getenv('AVIATIONSTACK_MAX_KEEPALIVE', '10'))
+
+# Caché de rutas (segundos / número de entradas)
+ROUTE_CACHE_TTL = float(os.getenv('ROUTE_CACHE_TTL', '300'))
+ROUTE_CACHE_NEGATIVE_TTL = float(os.getenv('ROUTE_CACHE_NEGATIVE_TTL', '60'))
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv('ROUTE_CACHE_MAX_ENTRIES', '1024'))
+
+# Almacén persistente en disco (ruta vacía para desactivarlo)
+RESPONSE_STORE_PATH = os.getenv('RESPONSE_STORE_PATH', 'vuelos_store.sqlite3')
+RESPONSE_STORE_MAX_AGE_DAYS = float(os.getenv('RESPONSE_STORE_MAX_AGE_DAYS', '7'))
+RESPONSE_STORE_WARM_TTL = float(os.getenv('RESPONSE_STORE_WARM_TTL', '3600'))
+
+# Histórico de tarifas en columnas (ruta vacía para desactivarlo)
+FARE_HISTORY_PATH = os.getenv('FARE_HISTORY_PATH', 'historial_precios')
+FARE_HISTORY_MAX_DAYS = float(os.getenv('FARE_HISTORY_MAX_DAYS', '365'))
+FARE_HISTORY_FLUSH_INTERVAL = float(os.getenv('FARE_HISTORY_FLUSH_INTERVAL', '1'))
+
+# Modo multi-worker: cuota y caché compartidas entre procesos a través del almacén
+MULTIWORKER_MODE = os.getenv('MULTIWORKER_MODE', '').lower() in ('1', 'true', 'yes')
+# Antigüedad máxima del contador global de cuota que se muestra (se relee en segundo plano)
+QUOTA_USAGE_REFRESH_SECONDS = float(os.getenv('QUOTA_USAGE_REFRESH_SECONDS', '5'))
+
+# Descarga de datos reales: 'ruta' pide cada par origen-destino; 'salidas' descarga
+# el panel de salidas del origen una vez y responde todas sus rutas desde un índice
+UPSTREAM_FETCH_MODE = os.getenv('UPSTREAM_FETCH_MODE', 'ruta').lower()
+BOARD_PAGE_SIZE = int(os.getenv('BOARD_PAGE_SIZE', '100'))
+BOARD_MAX_PAGES = int(os.getenv('BOARD_MAX_PAGES', '5'))
+BOARD_CACHE_TTL = float(os.getenv('BOARD_CACHE_TTL', '900'))
+BOARD_CACHE_MAX_ENTRIES = int(os.getenv('BOARD_CACHE_MAX_ENTRIES', '256'))
+
+# Circuit breaker y presupuesto de latencia para datos reales
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', '2'))
+CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))
+REAL_DATA_BUDGET_MS = float(os.getenv('REAL_DATA_BUDGET_MS', '300'))
+
+# Precarga de rutas populares
+PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', '1').lower() in ('1', 'true', 'yes')
+PREFETCH_TOP_N = int(os.getenv('PREFETCH_TOP_N', '10'))
+PREFETCH_RESERVE = int(os.getenv('PREFETCH_RESERVE', '20'))
+PREFETCH_INTERVAL = float(os.getenv('PREFETCH_INTERVAL', '3600'))
+PREFETCH_TTL = float(os.getenv('PREFETCH_TTL', str(PREFETCH_INTERVAL)))
+
+# Suscripciones en vivo por WebSocket
+WS_POLL_MIN_INTERVAL = float(os.getenv('WS_POLL_MIN_INTERVAL', '60'))
+# Intervalo mientras no queda cuota por encima de la reserva
+WS_POLL_MAX_INTERVAL = float(os.getenv('WS_POLL_MAX_INTERVAL', '3600'))
+WS_SEND_BUFFER = int(os.getenv('WS_SEND_BUFFER', '32'))
+WS_MAX_SUBSCRIPTIONS = int(os.getenv('WS_MAX_SUBSCRIPTIONS', '20'))
+
+# Itinerarios alternativos considerados por ruta
+ITINERARY_OPTIONS = int(os.getenv('ITINERARY_OPTIONS', '5'))
+# Construir la red de rutas al arrancar (si no, en la primera búsqueda que la use)
+AIRPORT_NETWORK_WARMUP = os.getenv('AIRPORT_NETWORK_WARMUP', '1').lower() in ('1', 'true', 'yes')
+
+# Búsquedas por lote
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '100'))
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '8'))
+
+# Búsquedas por ciudad, área metropolitana o radio
+MULTI_AIRPORT_MAX_AIRPORTS = int(os.getenv('MULTI_AIRPORT_MAX_AIRPORTS', '6'))
+MULTI_AIRPORT_MAX_PAIRS = int(os.getenv('MULTI_AIRPORT_MAX_PAIRS', '20'))
+MULTI_AIRPORT_MAX_RESULTS = int(os.getenv('MULTI_AIRPORT_MAX_RESULTS', '10'))
+MAX_SEARCH_RADIUS_KM = float(os.getenv('MAX_SEARCH_RADIUS_KM', '500'))
+
+# Resultados de /buscar-vuelos: vuelos reales por ruta, tamaño de página y
+# conjuntos completos guardados para servir las páginas siguientes
+REAL_FLIGHTS_PER_ROUTE = int(os.getenv('REAL_FLIGHTS_PER_ROUTE', '3'))
+SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', str(MULTI_AIRPORT_MAX_RESULTS)))
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', '100'))
+SEARCH_RESULTS_TTL = float(os.getenv('SEARCH_RESULTS_TTL', '120'))
+SEARCH_RESULTS_MAX_ENTRIES = int(os.getenv('SEARCH_RESULTS_MAX_ENTRIES', '1024'))
+
+# Control de admisión de las búsquedas: concurrencia, cola acotada y límite por cliente
+ADMISSION_PATHS = [p for p in os.getenv('ADMISSION_PATHS', '/buscar-vuelos,/calendario-precios,/itinerarios').split(',') if p]
+ADMISSION_MAX_CONCURRENCY = int(os.getenv('ADMISSION_MAX_CONCURRENCY', '64'))
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', '128'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '2'))
+ADMISSION_RETRY_AFTER = float(os.getenv('ADMISSION_RETRY_AFTER', '1'))
+ADMISSION_TRUST_PROXY = os.getenv('ADMISSION_TRUST_PROXY', '').lower() in ('1', 'true', 'yes')
+# Claves de API (cabecera X-API-Key) con bucket propio; las demás peticiones cuentan por IP
+ADMISSION_API_KEYS = [k.strip() for k in os.getenv('ADMISSION_API_KEYS', '').split(',') if k.strip()]
+RATE_LIMIT_PER_SECOND = float(os.getenv('RATE_LIMIT_PER_SECOND', '10'))
+RATE_LIMIT_BURST = float(os.getenv('RATE_LIMIT_BURST', '20'))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '10000'))
+
+# Calendario de precios
+CALENDAR_MAX_DAYS = int(os.getenv('CALENDAR_MAX_DAYS', '366'))
+
+# Simulación determinista: semilla global y duración de la franja en horas
+SIMULATION_SEED = int(os.getenv('SIMULATION_SEED', '0'))
+SIMULATION_BUCKET_HOURS = float(os.getenv('SIMULATION_BUCKET_HOURS', '24'))
+
+# Ruta rápida de serialización: vuelos sin validar y JSON con orjson
+FAST_SERIALIZATION = os.getenv('FAST_SERIALIZATION', '').lower() in ('1', 'true', 'yes')
+
+# Tipos de cambio: fichero local o, si se indica, una URL con el mismo formato JSON
+CURRENCY_RATES_FILE = os.getenv('CURRENCY_RATES_FILE', os.path.join(DATA_DIR, 'tipos_cambio.json'))
+CURRENCY_RATES_URL = os.getenv('CURRENCY_RATES_URL', '')
+CURRENCY_RATES_TTL = float(os.getenv('CURRENCY_RATES_TTL', '3600'))
+
+# Multiplicador de precio por aerolínea
+AIRLINE_MULTIPLIERS = {
+    'Iberia': 1.0,
+    'Vueling': 0.8,
+    'Ryanair': 0.7,
+    'British Airways': 1.3,
+    'Air France': 1.2,
+    'Lufthansa': 1.4,
+    'United Airlines': 1.5,
+    'American Airlines': 1.6,
+    'Delta Air Lines': 1.5,
+    'Southwest Airlines': 1.1
+}
+
+# Vista en arrays de las aerolíneas para el cálculo vectorizado de precios
+AIRLINE_NAMES = list(AEROLINEAS)
+AIRLINE_MULTIPLIER_ARRAY = np.array([AIRLINE_MULTIPLIERS.get(name, 1.0) for name in AIRLINE_NAMES])
+SITE_NAMES = list(SITIOS_COMPRA)
+
+# Simulador de tarifas: búsquedas idénticas en la misma franja dan los mismos vuelos
+fare_simulator = FareSimulator(
+    AIRLINE_NAMES,
+    AIRLINE_MULTIPLIER_ARRAY,
+    len(SITE_NAMES),
+    salt=SIMULATION_SEED,
+    bucket_hours=SIMULATION_BUCKET_HOURS
+)
+
+def make_flight(**fields) -> Union[Flight, FlightRecord]:
+    """Vuelo como modelo Pydantic o, con la ruta rápida, como registro sin validar"""
+    return FlightRecord(**fields) if FAST_SERIALIZATION else Flight(**fields)
+
+def build(model: Type[BaseModel], **fields):
+    """Instancia de `model` o, con la ruta rápida, un dict con sus mismos campos"""
+    return model_dict(model, **fields) if FAST_SERIALIZATION else model(**fields)
+
+def respond(payload):
+    """Deja que FastAPI serialice el modelo o devuelve directamente los bytes JSON"""
+    return json_response(payload) if FAST_SERIALIZATION else payload
+
+# Instantánea de tipos de cambio con refresco en segundo plano
+currency_engine = CurrencyEngine(
+    url_provider(CURRENCY_RATES_URL) if CURRENCY_RATES_URL else file_provider(CURRENCY_RATES_FILE),
+    source=CURRENCY_RATES_URL or CURRENCY_RATES_FILE,
+    ttl=CURRENCY_RATES_TTL
+)
+
+def currency_snapshot(moneda: str) -> RateSnapshot:
+    """Tipos vigentes si `moneda` está soportada; si no, error 400"""
+    snapshot = currency_engine.snapshot()
+    if not snapshot.supports(moneda):
+        raise HTTPException(status_code=400, detail=f"Moneda no soportada: {moneda}. Disponibles: {', '.join(sorted(snapshot.rates))}")
+    return snapshot
+
+def apply_currency(flights: List[Union[Flight, FlightRecord]], snapshot: RateSnapshot, moneda: str):
+    """Rellena precio_eur y expresa los precios en `moneda`, en bloque sobre todos los vuelos"""
+    if not flights:
+        return
+    usd = np.fromiter((flight.precio for flight in flights), dtype=np.float64, count=len(flights))
+    # precio_eur se mantiene sin redondear, como la aproximación de siempre
+    eur = (usd * snapshot.rates["EUR"]).tolist() if snapshot.supports("EUR") else [None] * len(flights)
+    converted = snapshot.convert(usd, moneda).tolist() if moneda != BASE_CURRENCY else None
+    for i, flight in enumerate(flights):
+        flight.precio_eur = eur[i]
+        if converted is not None:
+            flight.precio = converted[i]
+            flight.moneda = moneda
+
+def flight_json(flight: Union[Flight, FlightRecord]) -> str:
+    """JSON de un vuelo para los eventos del stream"""
+    if isinstance(flight, FlightRecord):
+        return dumps(flight).decode("utf-8")
+    return flight.model_dump_json()
 
 class AviationStackAPI:
     """Cliente para la API de AviationStack"""
@@ -67,6 +293,42 @@ class AviationStackAPI:
         self.base_url = AVIATIONSTACK_BASE_URL
         self.request_count = 0
         self.monthly_limit = 100  # Plan gratuito
+        self.client: Optional[httpx.AsyncClient] = None
+        self.store: Optional[ResponseStore] = None
+        self.shared = False
+        self.usage_checked = 0.0
+        self._usage_refresh: Optional[asyncio.Task] = None
+        self.breakers = {
+            "flights": CircuitBreaker(
+                "flights",
+                failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+                open_seconds=CIRCUIT_OPEN_SECONDS
+            )
+        }
+        self.count_month = datetime.now().strftime('%Y-%m')
+    
+    async def start(self):
+        """Abre el pool compartido de conexiones keep-alive"""
+        if self.client is not None:
+            return
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(
+                AVIATIONSTACK_READ_TIMEOUT,
+                connect=AVIATIONSTACK_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=AVIATIONSTACK_MAX_CONNECTIONS,
+                max_keepalive_connections=AVIATIONSTACK_MAX_KEEPALIVE
+            )
+        )
+    
+    async def close(self):
+        """Cierra el pool de conexiones"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
         
     def is_available(self) -> bool:
         """Verifica si la API key está configurada"""
@@ -74,45 +336,158 @@ class AviationStackAPI:
     
     def check_limits(self) -> bool:
         """Verifica si no hemos excedido los límites"""
+        month = datetime.now().strftime('%Y-%m')
+        if month != self.count_month:
+            self.count_month = month
+            self.request_count = 0
         return self.request_count < self.monthly_limit
     
-    def get_flights_today(self, dep_iata: str, arr_iata: str) -> List[dict]:
-        """Obtiene vuelos en tiempo real para hoy"""
-        if not self.is_available():
-            return []
-            
+    async def reserve_request(self) -> bool:
+        """Consume una petición de la cuota antes de llamar al upstream"""
         if not self.check_limits():
-            return []
-            
+            return False
+        if not self.shared:
+            # Se comprueba y se cuenta sin ceder el bucle: las peticiones concurrentes
+            # no pueden pasar todas la comprobación antes de que ninguna cuente
+            self.request_count += 1
+            if self.store is not None:
+                self.store.put_request_count(self.count_month, self.request_count)
+            return True
+        count = await asyncio.to_thread(self.store.reserve_request, self.count_month, self.monthly_limit)
+        self.usage_checked = time.monotonic()
+        if count is None:
+            self.request_count = self.monthly_limit
+            return False
+        self.request_count = count
+        return True
+    
+    def release_request(self):
+        """Devuelve una petición reservada que no llegó a obtener respuesta (modo de un worker)"""
+        if not self.shared and self.request_count > 0:
+            self.request_count -= 1
+    
+    def usage(self) -> int:
+        """Peticiones consumidas este mes (globales en modo multi-worker)
+
+        En modo multi-worker devuelve el último contador leído; si tiene más de
+        QUOTA_USAGE_REFRESH_SECONDS se relee en un hilo sin bloquear al que pregunta.
+        """
+        self.check_limits()
+        if self.shared and self._usage_refresh is None \
+                and time.monotonic() - self.usage_checked > QUOTA_USAGE_REFRESH_SECONDS:
+            self._usage_refresh = asyncio.get_running_loop().create_task(self._refresh_usage())
+        return self.request_count
+    
+    async def _refresh_usage(self):
+        month = self.count_month
         try:
-            # Parámetros para la búsqueda
-            params = {
-                'access_key': self.api_key,
-                'dep_iata': dep_iata,
-                'arr_iata': arr_iata,
-                'limit': 10,
-                'flight_status': 'scheduled'
-            }
-            
-            # Si se especifica una fecha, usarla
-            today = datetime.now().strftime('%Y-%m-%d')
-            params['flight_date'] = today
+            count = await asyncio.to_thread(self.store.load_request_count, month)
+            # Otra reserva puede haber leído ya un valor más reciente
+            if month == self.count_month:
+                self.request_count = max(self.request_count, count)
+        except Exception as e:
+            print(f"Error al leer la cuota compartida: {e}")
+        finally:
+            self.usage_checked = time.monotonic()
+            self._usage_refresh = None
+    
+    @staticmethod
+    def _record_call(breaker: CircuitBreaker, permit: int, ok: bool, started: float):
+        """Latencia de la llamada en las métricas y resultado en el circuit breaker"""
+        elapsed = time.perf_counter() - started
+        metricas.UPSTREAM_LATENCY.observe(elapsed)
+        breaker.record(permit, ok, elapsed)
+    
+    async def _request_flights(self, params: dict) -> Optional[dict]:
+        """Una llamada a /flights: respeta el circuito y la cuota y devuelve el JSON, o None"""
+        if not self.is_available():
+            return None
+        
+        # Con el circuito abierto no se gasta cuota ni se espera al upstream
+        breaker = self.breakers["flights"]
+        permit = breaker.allow()
+        if permit is None:
+            return None
             
-            url = f"{self.base_url}/flights"
-            response = requests.get(url, params=params, timeout=10)
+        # Si la reserva falla o se cancela hay que devolver el permiso (la prueba half-open)
+        reserved = False
+        try:
+            reserved = await self.reserve_request()
+        finally:
+            if not reserved:
+                breaker.release(permit)
+        if not reserved:
+            return None
+        
+        if self.client is None:
+            await self.start()
             
-            self.request_count += 1
+        try:
+            metricas.QUOTA_CONSUMED.inc()
+            started = time.perf_counter()
+            ok = False
+            try:
+                response = await self.client.get("/flights", params={'access_key': self.api_key, **params})
+                ok = response.status_code == 200
+            except asyncio.CancelledError:
+                # Una cancelación (baja de un sondeo, apagado) no dice nada del upstream
+                breaker.release(permit)
+                raise
+            except httpx.HTTPError as e:
+                metricas.UPSTREAM_REQUESTS.inc(type(e).__name__)
+                self.release_request()
+                self._record_call(breaker, permit, ok, started)
+                raise
+            except Exception:
+                self._record_call(breaker, permit, ok, started)
+                raise
+            self._record_call(breaker, permit, ok, started)
+            metricas.UPSTREAM_REQUESTS.inc(str(response.status_code))
             
             if response.status_code == 200:
-                data = response.json()
-                return data.get('data', [])
+                return response.json()
             else:
                 print(f"Error API: {response.status_code} - {response.text}")
-                return []
+                return None
                 
         except Exception as e:
             print(f"Error al obtener vuelos reales: {e}")
-            return []
+            return None
+    
+    async def get_flights_today(self, dep_iata: str, arr_iata: str) -> List[dict]:
+        """Obtiene vuelos en tiempo real para hoy"""
+        data = await self._request_flights({
+            'dep_iata': dep_iata,
+            'arr_iata': arr_iata,
+            'limit': 10,
+            'flight_status': 'scheduled',
+            'flight_date': datetime.now().strftime('%Y-%m-%d')
+        })
+        return data.get('data', []) if data else []
+    
+    async def get_flight_status(self, **filters) -> Optional[List[dict]]:
+        """Estado actual (cualquier flight_status) de los vuelos de hoy que cumplen `filters`; None si falla"""
+        data = await self._request_flights({
+            **filters,
+            'limit': 100,
+            'flight_date': datetime.now().strftime('%Y-%m-%d')
+        })
+        return data.get('data', []) if data else None
+    
+    async def get_departure_board(self, dep_iata: str) -> Optional[List[dict]]:
+        """Panel de salidas de hoy de un origen, todas las páginas (una petición de cuota cada una)"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        
+        def fetch_page(offset: int, limit: int):
+            return self._request_flights({
+                'dep_iata': dep_iata,
+                'limit': limit,
+                'offset': offset,
+                'flight_status': 'scheduled',
+                'flight_date': today
+            })
+        
+        return await panel_salidas.fetch_board(fetch_page, BOARD_PAGE_SIZE, BOARD_MAX_PAGES)
     
     def convert_to_our_format(self, flight_data: dict) -> Optional[Flight]:
         """Convierte datos de AviationStack a nuestro formato"""
@@ -136,7 +511,8 @@ class AviationStackAPI:
             # Generar número de vuelo realista
             flight_number = flight_info.get('iata', f"{airline_iata}{flight_info.get('number', '000')}")
             if not flight_number or len(flight_number) < 3:
-                flight_number = f"{airline_iata}{random.randint(100, 999)}"
+                number = 100 + fare_simulator.pick(hash_key(dep_iata, arr_iata, airline_iata), 0, STREAM_NUMBER, 900)
+                flight_number = f"{airline_iata}{number}"
             
             # Calcular duración estimada (simplificado)
             duration = self._estimate_duration(dep_iata, arr_iata)
@@ -147,18 +523,22 @@ class AviationStackAPI:
             # Obtener enlace de compra
             link_compra = self._generate_purchase_link(dep_iata, arr_iata, flight_number)
             
-            # Determinar si tiene escalas (simplificado)
-            escalas = 0 if random.random() > 0.3 else 1
+            # Cada registro de AviationStack es un único tramo: vuelo directo
+            escalas = 0
+            
+            # Hora programada de salida ('2026-10-18T07:30:00+00:00' -> '07:30')
+            scheduled = departure.get('scheduled') or ''
+            hora_salida = scheduled[11:16] if len(scheduled) >= 16 else None
             
-            return Flight(
+            return make_flight(
                 origen=dep_iata,
                 destino=arr_iata,
                 fecha=datetime.now().strftime('%Y-%m-%d'),
                 precio=precio_usd,
-                precio_eur=precio_usd * 0.85,  # Aproximación
                 aerolinea=airline_name,
                 numero_vuelo=flight_number,
                 duracion=duration,
+                hora_salida=hora_salida,
                 escalas=escalas,
                 link_compra=link_compra,
                 tipo_busqueda="tiempo_real"
@@ -170,87 +550,44 @@ class AviationStackAPI:
     
     def _estimate_duration(self, dep_iata: str, arr_iata: str) -> str:
         """Estima la duración del vuelo basada en la distancia entre aeropuertos"""
-        # Distancias aproximadas entre aeropuertos principales (en minutos)
-        distances = {
-            ('MAD', 'BCN'): 75,  # Madrid-Barcelona
-            ('MAD', 'LHR'): 120,  # Madrid-Londres
-            ('JFK', 'LAX'): 360,  # New York-Los Angeles
-            ('JFK', 'CDG'): 420,  # New York-París
-            ('MAD', 'JFK'): 480,  # Madrid-New York
-        }
-        
-        route = tuple(sorted([dep_iata, arr_iata]))
+        duration_minutes = distancias.duration_minutes(dep_iata, arr_iata)
         
-        if route in distances:
-            duration_minutes = distances[route]
-        else:
-            # Estimar basado en distancia aproximada
-            duration_minutes = random.randint(90, 600)
+        if duration_minutes is None:
+            # Aeropuerto fuera de la tabla: sin coordenadas para estimar
+            duration_minutes = 90 + fare_simulator.pick(hash_key(dep_iata, arr_iata), 0, 0, 511)
         
         hours = duration_minutes // 60
         minutes = duration_minutes % 60
         
         return f"{hours}h {minutes}m"
     
-    def _generate_realistic_price(self, dep_iata: str, arr_iata: str, airline_name: str) -> float:
+    def _base_price(self, dep_iata: str, arr_iata: str) -> float:
+        """Precio base por distancia y región de la ruta"""
+        base_price = distancias.base_price(dep_iata, arr_iata)
+        if base_price is None:
+            base_price = distancias.REGION_BASE_PRICES.get(self._get_region(dep_iata, arr_iata), 300)
+        return base_price
+    
+    def _generate_realistic_price(self, dep_iata: str, arr_iata: str, airline_name: str,
+                                  fecha: Optional[str] = None) -> float:
         """Genera un precio realista basado en ruta y aerolínea"""
-        # Precios base por distancia (aproximados)
-        base_prices = {
-            'Europa': 150,
-            'America_Norte': 400,
-            'America_Sur': 600,
-            'Asia': 800,
-            'Africa': 500,
-            'Oceania': 900
-        }
-        
-        # Determinar región basada en códigos de aeropuerto
-        region = self._get_region(dep_iata, arr_iata)
-        base_price = base_prices.get(region, 300)
-        
-        # Multiplicador por aerolínea
-        airline_multipliers = {
-            'Iberia': 1.0,
-            'Vueling': 0.8,
-            'Ryanair': 0.7,
-            'British Airways': 1.3,
-            'Air France': 1.2,
-            'Lufthansa': 1.4,
-            'United Airlines': 1.5,
-            'American Airlines': 1.6,
-            'Delta Air Lines': 1.5,
-            'Southwest Airlines': 1.1
-        }
+        fecha = fecha or datetime.now().strftime('%Y-%m-%d')
         
-        multiplier = airline_multipliers.get(airline_name, 1.0)
-        
-        # Variación aleatoria del ±20%
-        variation = random.uniform(0.8, 1.2)
-        
-        return round(base_price * multiplier * variation, 2)
+        # Base × multiplicador de aerolínea × variación ±20% determinista por ruta y franja
+        seed = fare_simulator.route_seed(dep_iata, arr_iata, fecha)
+        return fare_simulator.price(seed, airline_name, self._base_price(dep_iata, arr_iata))
     
     def _get_region(self, dep_iata: str, arr_iata: str) -> str:
         """Determina la región de la ruta"""
-        # Agrupación por regiones (simplificado)
-        europe_airports = ['MAD', 'BCN', 'LHR', 'CDG', 'FCO', 'FRA', 'AMS', 'CPH', 'ARN', 'DUB']
-        us_airports = ['JFK', 'LAX', 'ORD', 'ATL', 'DFW', 'DEN', 'SEA', 'LAS', 'PHX', 'MIA']
-        asia_airports = ['NRT', 'PVG', 'PEK', 'ICN', 'SIN', 'BKK', 'HKG', 'DXB', 'DEL', 'MNL']
-        
-        if dep_iata in europe_airports or arr_iata in europe_airports:
-            return 'Europa'
-        elif dep_iata in us_airports or arr_iata in us_airports:
-            if arr_iata in europe_airports or dep_iata in europe_airports:
-                return 'America_Norte'  # Intercontinental
-            return 'America_Norte'
-        elif dep_iata in asia_airports or arr_iata in asia_airports:
-            return 'Asia'
-        else:
-            return 'Europa'  # Por defecto
+        return distancias.route_region(dep_iata, arr_iata) or 'Europa'  # Por defecto
     
-    def _generate_purchase_link(self, dep_iata: str, arr_iata: str, flight_number: str) -> str:
+    def _generate_purchase_link(self, dep_iata: str, arr_iata: str, flight_number: str,
+                                site_index: Optional[int] = None) -> str:
         """Genera un enlace de compra realista"""
-        # Seleccionar sitio de compra aleatorio
-        site = random.choice(list(SITIOS_COMPRA.keys()))
+        # Seleccionar sitio de compra (determinista por vuelo si no se indica)
+        if site_index is None:
+            site_index = fare_simulator.pick(hash_key(dep_iata, arr_iata, flight_number), 0, STREAM_SITE, len(SITE_NAMES))
+        site = SITE_NAMES[site_index]
         today = datetime.now().strftime('%Y-%m-%d')
         
         # Enlaces con parámetros
@@ -270,69 +607,420 @@ class AviationStackAPI:
 # Instancia global del cliente API
 aviation_client = AviationStackAPI()
 
-def generate_mock_flights(search: FlightSearch) -> List[Flight]:
-    """Genera vuelos simulados mejorados como fallback"""
+# Uso de cuota visible en /metrics
+metricas.REGISTRY.register(metricas.Gauge(
+    "aviationstack_quota_used", "Peticiones consumidas este mes", lambda: aviation_client.request_count
+))
+metricas.REGISTRY.register(metricas.Gauge(
+    "aviationstack_quota_limit", "Límite mensual de peticiones", lambda: aviation_client.monthly_limit
+))
+
+# Tareas de fondo que se cancelan al apagar
+background_tasks: List[asyncio.Task] = []
+
+# Consultas reales que superaron el presupuesto y terminan en segundo plano
+pending_fetches = set()
+
+metricas.REGISTRY.register(metricas.Gauge(
+    "aviationstack_circuit_open", "1 si el circuit breaker de /flights no está cerrado",
+    lambda: 0 if aviation_client.breakers["flights"].state == "closed" else 1
+))
+
+# Caché compartida de respuestas por (origen, destino, fecha)
+route_cache = RouteCache(
+    ttl=ROUTE_CACHE_TTL,
+    negative_ttl=ROUTE_CACHE_NEGATIVE_TTL,
+    max_entries=ROUTE_CACHE_MAX_ENTRIES
+)
+
+# Paneles de salidas indexados por llegada, por (origen, fecha)
+board_cache = RouteCache(
+    ttl=BOARD_CACHE_TTL,
+    negative_ttl=ROUTE_CACHE_NEGATIVE_TTL,
+    max_entries=BOARD_CACHE_MAX_ENTRIES
+)
+
+async def prefetch_route(origen: str, destino: str, fecha: str):
+    """Descarga una ruta a la caché con el TTL de la precarga"""
+    await route_cache.get_or_fetch(
+        (origen, destino, fecha),
+        lambda: fetch_real_flights(origen, destino, fecha),
+        ttl=PREFETCH_TTL
+    )
+
+# Precarga de las rutas más buscadas dentro del presupuesto de cuota
+prefetcher = Prefetcher(
+    prefetch_route,
+    is_fresh=lambda key: route_cache.get(key) is not None,
+    quota=lambda: (aviation_client.usage(), aviation_client.monthly_limit),
+    top_n=PREFETCH_TOP_N,
+    reserve=PREFETCH_RESERVE,
+    interval=PREFETCH_INTERVAL
+)
+_prefetch_lock = None
+
+# Un sondeo al upstream por suscripción única, compartido por todos sus clientes
+live_hub = LiveHub(
+    lambda origen, destino: aviation_client.get_flight_status(dep_iata=origen, arr_iata=destino),
+    lambda numero_vuelo: aviation_client.get_flight_status(flight_iata=numero_vuelo),
+    quota=lambda: (aviation_client.usage(), aviation_client.monthly_limit),
+    reserve=PREFETCH_RESERVE,
+    min_interval=WS_POLL_MIN_INTERVAL,
+    max_interval=WS_POLL_MAX_INTERVAL,
+    max_per_client=WS_MAX_SUBSCRIPTIONS
+)
+
+def acquire_prefetch_lock() -> bool:
+    """En modo multi-worker solo precarga el worker que obtiene el lock de fichero"""
+    global _prefetch_lock
+    import fcntl
+    lock_file = open(f"{RESPONSE_STORE_PATH}.prefetch.lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _prefetch_lock = lock_file
+    return True
+
+# Índice de autocompletado de aeropuertos
+airport_index = AirportIndex(AEROPUERTOS)
+# Una sola construcción del índice aunque lleguen varias primeras búsquedas a la vez
+airport_index_lock = asyncio.Lock()
+
+# Resolución de ciudades y áreas metropolitanas a aeropuertos
+location_resolver = LocationResolver(AEROPUERTOS, distancias.spatial_grid, max_airports=MULTI_AIRPORT_MAX_AIRPORTS)
+
+# Catálogo estático pre-serializado (JSON, gzip, brotli y ETag)
+catalog = Catalog(AEROPUERTOS, AEROLINEAS, SITIOS_COMPRA)
+
+# Almacén en disco de payloads y contador mensual
+response_store = ResponseStore(
+    RESPONSE_STORE_PATH,
+    max_age_days=RESPONSE_STORE_MAX_AGE_DAYS
+) if RESPONSE_STORE_PATH else None
+
+# Histórico de todas las tarifas calculadas o recibidas
+fare_history = FareHistory(
+    FARE_HISTORY_PATH,
+    max_age_days=FARE_HISTORY_MAX_DAYS,
+    flush_interval=FARE_HISTORY_FLUSH_INTERVAL
+) if FARE_HISTORY_PATH else None
+
+def record_fares(flights: List[Flight]):
+    """Encola las tarifas para el histórico (la escritura es en segundo plano)"""
+    if fare_history is not None:
+        fare_history.record([
+            (f.origen, f.destino, f.fecha, f.aerolinea, f.precio, f.tipo_busqueda) for f in flights
+        ])
+
+# Control de admisión de las rutas de búsqueda (/health, /aeropuertos y /metrics quedan fuera)
+admission = AdmissionControl(
+    ConcurrencyLimiter(ADMISSION_MAX_CONCURRENCY, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT),
+    RateLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, max_clients=RATE_LIMIT_MAX_CLIENTS),
+    ADMISSION_PATHS,
+    retry_after=ADMISSION_RETRY_AFTER,
+    trust_proxy=ADMISSION_TRUST_PROXY,
+    api_keys=ADMISSION_API_KEYS
+)
+
+metricas.REGISTRY.register(metricas.Gauge(
+    "admission_active_requests", "Búsquedas en curso", lambda: admission.limiter.active
+))
+metricas.REGISTRY.register(metricas.Gauge(
+    "admission_queued_requests", "Búsquedas esperando plaza", lambda: admission.limiter.queued
+))
+
+# Middlewares, del más interno al más externo: los rechazos de admisión
+# también llevan cabeceras CORS y quedan en las métricas de latencia
+app.add_middleware(AdmissionMiddleware, control=admission)
+
+# Configuración CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["Retry-After"],
+)
+
+# Latencia por ruta para /metrics
+app.add_middleware(metricas.MetricsMiddleware)
+
+@app.on_event("startup")
+async def startup():
+    """Inicializa el pool de conexiones hacia AviationStack"""
+    await aviation_client.start()
+    await currency_engine.refresh()
+    background_tasks.append(asyncio.create_task(metricas.monitor_event_loop()))
+    if response_store is not None:
+        response_store.open()
+        aviation_client.store = response_store
+        aviation_client.shared = MULTIWORKER_MODE
+        if MULTIWORKER_MODE:
+            prefetcher.store = response_store
+        aviation_client.request_count = response_store.load_request_count(aviation_client.count_month)
+        today = datetime.now().strftime('%Y-%m-%d')
+        for key, fetched_at, payload in response_store.load_responses(today, RESPONSE_STORE_WARM_TTL):
+            age = datetime.now().timestamp() - fetched_at
+            if key[1] == panel_salidas.BOARD_DESTINATION:
+                if age < BOARD_CACHE_TTL:
+                    board_cache.set((key[0], key[2]), panel_salidas.index_board(payload),
+                                    ttl=BOARD_CACHE_TTL - age)
+            else:
+                route_cache.set(key, payload, ttl=RESPONSE_STORE_WARM_TTL - age)
+    if fare_history is not None:
+        fare_history.open()
+    # Catálogo completo codificado en un hilo antes de servir la primera petición
+    await catalog.view()
+    if AIRPORT_NETWORK_WARMUP:
+        # La red de rutas se construye aquí, en un hilo, y no en la primera búsqueda simulada
+        await asyncio.to_thread(itinerarios.route_network)
+    
+    if PREFETCH_ENABLED and aviation_client.is_available():
+        if not aviation_client.shared or acquire_prefetch_lock():
+            background_tasks.append(asyncio.create_task(prefetcher.run()))
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Libera el pool de conexiones hacia AviationStack"""
+    await live_hub.close()
+    await currency_engine.close()
+    for task in [*background_tasks, *pending_fetches]:
+        task.cancel()
+    await asyncio.gather(*background_tasks, *pending_fetches, return_exceptions=True)
+    background_tasks.clear()
+    await aviation_client.close()
+    if response_store is not None:
+        response_store.close()
+    if fare_history is not None:
+        fare_history.close()
+
+async def fetch_departure_board(origen: str, fecha: str) -> dict:
+    """Panel de salidas de un origen indexado por llegada; se persiste como una sola entrada"""
+    key = (origen, panel_salidas.BOARD_DESTINATION, fecha)
+    if aviation_client.shared:
+        # Otro worker puede haber descargado ya el panel
+        cached = await asyncio.to_thread(response_store.get_response, key, board_cache.ttl)
+        if cached is not None:
+            return panel_salidas.index_board(cached)
+    flights = await aviation_client.get_departure_board(origen)
+    if flights and response_store is not None:
+        response_store.put_response(key, flights)
+    return panel_salidas.index_board(flights or [])
+
+async def fetch_real_flights(origen: str, destino: str, fecha: str) -> List[dict]:
+    """Consulta AviationStack y persiste el payload crudo si hay datos"""
+    if UPSTREAM_FETCH_MODE == "salidas":
+        board = await board_cache.get_or_fetch((origen, fecha), lambda: fetch_departure_board(origen, fecha))
+        return board.get(destino, []) if board else []
+    if aviation_client.shared:
+        # Otro worker puede haber descargado ya la ruta
+        cached = await asyncio.to_thread(
+            response_store.get_response, (origen, destino, fecha), route_cache.ttl
+        )
+        if cached is not None:
+            return cached
+    real_flights = await aviation_client.get_flights_today(origen, destino)
+    if real_flights and response_store is not None:
+        response_store.put_response((origen, destino, fecha), real_flights)
+    return real_flights
+
+async def get_real_flights(search: FlightSearch, budget: Optional[float] = REAL_DATA_BUDGET_MS / 1000) -> List[Flight]:
+    """Obtiene hasta 3 vuelos reales (solo búsquedas para hoy)
+
+    Si los datos no llegan dentro de `budget` segundos se devuelve una lista
+    vacía; la consulta sigue en segundo plano y su resultado queda en caché.
+    """
     flights = []
     today = datetime.now()
     search_date = datetime.strptime(search.fecha, '%Y-%m-%d')
     
     # Determinar si la búsqueda es para hoy o futura
     is_today = search_date.date() == today.date()
-    is_future = search_date > today + timedelta(days=1)
     
     # Si es futura, usar vuelos programados simulados
     # Si es hoy, intentar obtener datos reales primero
-    real_flights = []
-    
     if is_today and aviation_client.is_available():
-        real_flights = aviation_client.get_flights_today(search.origen, search.destino)
+        fetch = asyncio.ensure_future(route_cache.get_or_fetch(
+            (search.origen, search.destino, search.fecha),
+            lambda: fetch_real_flights(search.origen, search.destino, search.fecha)
+        ))
+        try:
+            done, _ = await asyncio.wait({fetch}, timeout=budget)
+        finally:
+            if not fetch.done():
+                # Presupuesto agotado o cliente desconectado: la descarga (quizá compartida con
+                # otras búsquedas) sigue, su resultado queda en caché y el apagado la recoge
+                pending_fetches.add(fetch)
+                fetch.add_done_callback(pending_fetches.discard)
+        if fetch in done:
+            real_flights = fetch.result()
+        else:
+            metricas.BUDGET_EXCEEDED.inc()
+            real_flights = []
         
         # Convertir vuelos reales
-        for flight_data in real_flights[:3]:  # Limitar a 3 vuelos reales
+        for flight_data in real_flights[:REAL_FLIGHTS_PER_ROUTE]:
             flight = aviation_client.convert_to_our_format(flight_data)
             if flight:
                 flights.append(flight)
     
-    # Completar con vuelos simulados si es necesario
-    num_mock_flights = 3 - len(flights) if len(flights) < 3 else 0
+    record_fares(flights)
+    metricas.FLIGHTS_GENERATED.inc("real", amount=len(flights))
+    return flights
+
+def format_duration(duration_minutes: int) -> str:
+    """Formatea minutos como '2h 15m'"""
+    return f"{duration_minutes // 60}h {duration_minutes % 60}m"
+
+def choose_itinerary(origen: str, destino: str, u_direct: float, u_option: float) -> Optional[dict]:
+    """Elige un itinerario: directo el 75% de las veces si existe, si no uno con escalas"""
+    options = itinerarios.find_itineraries(origen, destino, k=ITINERARY_OPTIONS)
+    if not options:
+        return None
+    direct = [option for option in options if option["escalas"] == 0]
+    connecting = [option for option in options if option["escalas"] > 0]
+    if direct and (not connecting or u_direct < 0.75):
+        return direct[0]
+    return connecting[int(u_option * len(connecting))]
+
+def build_mock_flights_bulk(searches: List[FlightSearch], counts: List[int]) -> List[List[Flight]]:
+    """Genera counts[i] vuelos simulados para cada búsqueda en una sola pasada vectorizada"""
+    routes = [(search.origen, search.destino, search.fecha) for search in searches]
+    base_prices = np.array([aviation_client._base_price(o, d) for o, d, _ in routes])
+    batch = fare_simulator.simulate(fare_simulator.route_seeds(routes), counts, base_prices)
     
-    for i in range(num_mock_flights):
-        # Seleccionar aerolínea aleatoria
-        airline_name, airline_info = random.choice(list(AEROLINEAS.items()))
-        airline_code = airline_info["codigo"]
+    results: List[List[Flight]] = [[] for _ in searches]
+    for route, airline, number, precio_usd, site, u_direct, u_option, departure in zip(
+        batch.route.tolist(), batch.airline.tolist(), batch.number.tolist(), batch.price.tolist(),
+        batch.site.tolist(), batch.itinerary.tolist(), batch.option.tolist(), batch.departure.tolist()
+    ):
+        search = searches[route]
+        airline_name = AIRLINE_NAMES[airline]
         
         # Generar número de vuelo
-        flight_number = f"{airline_code}{random.randint(100, 999)}"
-        
-        # Calcular duración
-        duration = aviation_client._estimate_duration(search.origen, search.destino)
+        flight_number = f"{AEROLINEAS[airline_name]['codigo']}{number}"
         
-        # Precio realista
-        precio_usd = aviation_client._generate_realistic_price(search.origen, search.destino, airline_name)
+        # Elegir itinerario de la red de rutas (directo o con escalas)
+        itinerary = choose_itinerary(search.origen, search.destino, u_direct, u_option)
+        if itinerary:
+            duration = format_duration(itinerary["duracion_total_min"])
+            escalas = itinerary["escalas"]
+            tramos = itinerary["tramos"]
+        else:
+            duration = aviation_client._estimate_duration(search.origen, search.destino)
+            escalas = 0 if u_direct < 0.75 else 1  # 75% directo, 25% con escalas
+            tramos = []
         
         # Link de compra
-        link_compra = aviation_client._generate_purchase_link(search.origen, search.destino, flight_number)
-        
-        # Escalas aleatorias
-        escalas = random.choice([0, 0, 0, 1])  # 75% directo, 25% con escalas
+        link_compra = aviation_client._generate_purchase_link(search.origen, search.destino, flight_number, site)
         
-        mock_flight = Flight(
+        mock_flight = make_flight(
             origen=search.origen,
             destino=search.destino,
             fecha=search.fecha,
             precio=precio_usd,
-            precio_eur=precio_usd * 0.85,
             aerolinea=airline_name,
             numero_vuelo=flight_number,
             duracion=duration,
+            hora_salida=f"{departure // 60:02d}:{departure % 60:02d}",
             escalas=escalas,
             link_compra=link_compra,
-            tipo_busqueda="simulado_mejorado"
+            tipo_busqueda="simulado_mejorado",
+            tramos=tramos
         )
         
-        flights.append(mock_flight)
+        results[route].append(mock_flight)
+    
+    record_fares([flight for flights in results for flight in flights])
+    metricas.FLIGHTS_GENERATED.inc("simulado", amount=len(batch.route))
+    return results
+
+def build_mock_flights(search: FlightSearch, count: int) -> List[Flight]:
+    """Genera `count` vuelos simulados para una búsqueda"""
+    return build_mock_flights_bulk([search], [count])[0]
+
+def mock_flights_needed(real_flights: List[Flight]) -> int:
+    """Vuelos simulados necesarios para completar 3 resultados"""
+    return 3 - len(real_flights) if len(real_flights) < 3 else 0
+
+def merge_flights(real_flights: List[Flight], search: FlightSearch,
+                  mock_flights: Optional[List[Flight]] = None) -> List[Flight]:
+    """Completa con vuelos simulados hasta 3 (reales primero, sin ordenar: el orden lo elige quien lo usa)"""
+    if mock_flights is None:
+        mock_flights = build_mock_flights(search, mock_flights_needed(real_flights))
+    return real_flights + mock_flights
+
+async def generate_mock_flights(search: FlightSearch) -> List[Flight]:
+    """Genera vuelos simulados mejorados como fallback"""
+    real_flights = await get_real_flights(search)
+    return merge_flights(real_flights, search)
+
+def validate_search(search: FlightSearch) -> Optional[str]:
+    """Devuelve el motivo por el que una búsqueda no es válida, o None"""
+    if search.origen not in AEROPUERTOS:
+        return f"Aeropuerto de origen no válido: {search.origen}"
+    
+    if search.destino not in AEROPUERTOS:
+        return f"Aeropuerto de destino no válido: {search.destino}"
+    
+    if search.origen == search.destino:
+        return "El origen y destino no pueden ser el mismo"
     
-    return sorted(flights, key=lambda x: x.precio)
+    return None
+
+def parse_search_date(fecha: str) -> str:
+    """Fecha de la búsqueda normalizada a YYYY-MM-DD; error 400 si no es válida"""
+    try:
+        return datetime.strptime(fecha, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Fecha no válida: {fecha}")
+
+def resolve_airports(search: FlightSearch) -> Tuple[List[str], List[str]]:
+    """Aeropuertos de origen y destino de la búsqueda (ciudad, área metropolitana o radio)"""
+    for radius in (search.radio_origen_km, search.radio_destino_km):
+        if radius is not None and not 0 <= radius <= MAX_SEARCH_RADIUS_KM:
+            raise HTTPException(status_code=400, detail=f"El radio debe estar entre 0 y {MAX_SEARCH_RADIUS_KM:g} km")
+    
+    origins = location_resolver.resolve(search.origen, search.radio_origen_km)
+    if not origins:
+        raise HTTPException(status_code=400, detail=f"Aeropuerto, ciudad o área de origen no válido: {search.origen}")
+    destinations = location_resolver.resolve(search.destino, search.radio_destino_km)
+    if not destinations:
+        raise HTTPException(status_code=400, detail=f"Aeropuerto, ciudad o área de destino no válido: {search.destino}")
+    if all(origen == destino for origen, destino in itertools.product(origins, destinations)):
+        raise HTTPException(status_code=400, detail="El origen y destino no pueden ser el mismo")
+    return origins, destinations
+
+async def search_multi_airport(search: FlightSearch, origins: List[str], destinations: List[str]) -> List[Flight]:
+    """Busca en paralelo todos los pares origen×destino y devuelve todos sus vuelos"""
+    pairs = [
+        FlightSearch(origen=origen, destino=destino, fecha=search.fecha, adultos=search.adultos)
+        for origen, destino in itertools.product(origins, destinations) if origen != destino
+    ][:MULTI_AIRPORT_MAX_PAIRS]
+    
+    # Un único presupuesto de latencia para todos los pares
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + REAL_DATA_BUDGET_MS / 1000
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    
+    async def lookup(pair: FlightSearch) -> List[Flight]:
+        async with semaphore:
+            try:
+                return await get_real_flights(pair, budget=max(0.0, deadline - loop.time()))
+            except Exception as e:
+                print(f"Error buscando {pair.origen}-{pair.destino}: {e}")
+                return []
+    
+    for pair in pairs:
+        prefetcher.record(pair.origen, pair.destino)
+    real = await asyncio.gather(*(lookup(pair) for pair in pairs))
+    mocks = build_mock_flights_bulk(pairs, [mock_flights_needed(flights) for flights in real])
+    
+    # Par a par en orden: la página se elige después con top-k (a igual precio gana el primer par)
+    per_pair = [merge_flights(flights, pair, mock) for flights, pair, mock in zip(real, pairs, mocks)]
+    return [flight for flights in per_pair for flight in flights]
 
 @app.get("/")
 async def root():
@@ -340,9 +1028,9 @@ async def root():
     return {
         "mensaje": "FlightSearch Pro - API v3.0 con Datos Reales",
         "version": "3.0",
-        "endpoints": ["/health", "/buscar-vuelos", "/aeropuertos", "/api-info"],
+        "endpoints": ["/health", "/buscar-vuelos", "/buscar-vuelos/stream", "/buscar-vuelos/lote", "/calendario-precios", "/historial-precios", "/aeropuertos", "/aeropuertos/buscar", "/itinerarios", "/ws/vuelos", "/metrics", "/api-info"],
         "datos_reales": aviation_client.is_available(),
-        "request_count": f"{aviation_client.request_count}/{aviation_client.monthly_limit}"
+        "request_count": f"{aviation_client.usage()}/{aviation_client.monthly_limit}"
     }
 
 @app.get("/health")
@@ -353,50 +1041,451 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "version": "3.0",
         "aviationstack_configured": aviation_client.is_available(),
-        "api_usage": f"{aviation_client.request_count}/{aviation_client.monthly_limit}"
+        "api_usage": f"{aviation_client.usage()}/{aviation_client.monthly_limit}"
     }
 
-@app.post("/buscar-vuelos")
-async def buscar_vuelos(search: FlightSearch):
-    """Busca vuelos con datos reales y simulados mejorados"""
+def result_filter(rates: RateSnapshot, moneda: str, precio_max: Optional[float], aerolineas: Optional[str],
+                  escalas_max: Optional[int], salida_desde: Optional[str], salida_hasta: Optional[str],
+                  duracion_max: Optional[int]) -> ResultFilter:
+    """Filtros de /buscar-vuelos validados (el precio máximo va en `moneda`)"""
+    try:
+        desde = clock_minutes(salida_desde) if salida_desde else None
+        hasta = clock_minutes(salida_hasta) if salida_hasta else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Las horas de salida deben tener el formato HH:MM")
+    return ResultFilter(
+        precio_max=precio_max,
+        aerolineas=parse_airlines(aerolineas),
+        escalas_max=escalas_max,
+        salida_desde=desde,
+        salida_hasta=hasta,
+        duracion_max=duracion_max,
+        price_rate=rates.rates[moneda] if moneda != BASE_CURRENCY else 1.0,
+        price_decimals=rates.decimals.get(moneda, 2)
+    )
+
+# Conjuntos completos de resultados por búsqueda, para servir las páginas siguientes
+search_results = RouteCache(
+    ttl=SEARCH_RESULTS_TTL,
+    negative_ttl=ROUTE_CACHE_NEGATIVE_TTL,
+    max_entries=SEARCH_RESULTS_MAX_ENTRIES
+)
+
+@app.post("/buscar-vuelos", responses={200: {"model": SearchResponse}})
+async def buscar_vuelos(search: FlightSearch, moneda: str = BASE_CURRENCY,
+                        precio_max: Optional[float] = None, aerolineas: Optional[str] = None,
+                        escalas_max: Optional[int] = None, salida_desde: Optional[str] = None,
+                        salida_hasta: Optional[str] = None, duracion_max: Optional[int] = None,
+                        orden: str = "precio", limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Busca vuelos con datos reales y simulados mejorados
+
+    Filtros, orden y página se aplican en el servidor; `cursor` es el
+    `siguiente_cursor` de la página anterior con los mismos parámetros.
+    """
     try:
-        # Validar que los aeropuertos existen
-        if search.origen not in AEROPUERTOS:
-            raise HTTPException(status_code=400, detail=f"Aeropuerto de origen no válido: {search.origen}")
+        # Una sola validación de la fecha para la ruta simple y la multi-aeropuerto
+        search.fecha = parse_search_date(search.fecha)
+        moneda = moneda.upper()
+        rates = currency_snapshot(moneda)
+        if orden not in SORT_KEYS:
+            raise HTTPException(status_code=400, detail=f"Orden no válido: usa {', '.join(SORT_KEYS)}")
+        filters = result_filter(rates, moneda, precio_max, aerolineas, escalas_max,
+                                salida_desde, salida_hasta, duracion_max)
+        limit = SEARCH_DEFAULT_LIMIT if limit is None else max(1, min(limit, SEARCH_MAX_LIMIT))
         
-        if search.destino not in AEROPUERTOS:
-            raise HTTPException(status_code=400, detail=f"Aeropuerto de destino no válido: {search.destino}")
+        single = search.origen in AEROPUERTOS and search.destino in AEROPUERTOS \
+            and not search.radio_origen_km and not search.radio_destino_km
+        if single:
+            # Validar que los aeropuertos existen
+            error = validate_search(search)
+            if error:
+                raise HTTPException(status_code=400, detail=error)
+            prefetcher.record(search.origen, search.destino)
+            origins, destinations = [search.origen], [search.destino]
+        else:
+            # Ciudad, área metropolitana o radio: varios aeropuertos por extremo
+            origins, destinations = resolve_airports(search)
         
-        if search.origen == search.destino:
-            raise HTTPException(status_code=400, detail="El origen y destino no pueden ser el mismo")
+        key = (tuple(origins), tuple(destinations), search.fecha, search.adultos)
+        # La moneda y no su tipo de cambio: el cursor sigue valiendo aunque se refresquen los tipos
+        fingerprint = hash_key(*key, *filters._replace(price_rate=1.0), moneda, orden)
+        after, flights = None, None
+        if cursor:
+            try:
+                after = decode_cursor(cursor, fingerprint, orden)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            flights = search_results.get(key)
+        if flights is None:
+            # Generar vuelos (reales + simulados)
+            if single:
+                flights = await generate_mock_flights(search)
+            else:
+                flights = await search_multi_airport(search, origins, destinations)
+            search_results.set(key, flights)
         
-        # Generar vuelos (reales + simulados)
-        vuelos = generate_mock_flights(search)
+        # Top-k perezoso sobre el conjunto; se convierten copias para no tocar el guardado
+        page = select_page(flights, filters, orden, limit, after)
+        vuelos = [copy.copy(flight) for flight in page.flights]
+        apply_currency(vuelos, rates, moneda)
         
-        return SearchResponse(
+        return respond(build(
+            SearchResponse,
             success=True,
             vuelos=vuelos,
             total=len(vuelos),
+            total_resultados=page.matching,
+            siguiente_cursor=encode_cursor(fingerprint, orden, page.next_key) if page.next_key else None,
             modo="datos_reales",
             datos_reales=aviation_client.is_available(),
-            fecha_busqueda=datetime.now().isoformat()
-        )
+            fecha_busqueda=datetime.now().isoformat(),
+            aeropuertos_origen=origins,
+            aeropuertos_destino=destinations
+        ))
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
+def format_stream_event(event: str, data: str, formato: str) -> str:
+    """Codifica un evento como línea NDJSON o mensaje SSE"""
+    if formato == "sse":
+        return f"event: {event}\ndata: {data}\n\n"
+    return f'{{"tipo": "{event}", "data": {data}}}\n'
+
+async def stream_search(search: FlightSearch, formato: str, rates: RateSnapshot,
+                        moneda: str = BASE_CURRENCY) -> AsyncIterator[str]:
+    """Emite primero los simulados y después los reales según llegan"""
+    simulados = build_mock_flights(search, 3)
+    apply_currency(simulados, rates, moneda)
+    for flight in simulados:
+        yield format_stream_event("vuelo", flight_json(flight), formato)
+    
+    reales = 0
+    try:
+        real_flights = await get_real_flights(search, budget=None)
+        apply_currency(real_flights, rates, moneda)
+        for flight in real_flights:
+            reales += 1
+            yield format_stream_event("vuelo", flight_json(flight), formato)
+    except Exception as e:
+        yield format_stream_event("error", json.dumps({"detail": f"Error interno: {str(e)}"}), formato)
+    
+    resumen = {
+        "total": len(simulados) + reales,
+        "reales": reales,
+        "simulados": len(simulados),
+        "datos_reales": aviation_client.is_available(),
+        "fecha_busqueda": datetime.now().isoformat()
+    }
+    yield format_stream_event("resumen", json.dumps(resumen), formato)
+
+@app.post("/buscar-vuelos/stream")
+async def buscar_vuelos_stream(search: FlightSearch, formato: str = "ndjson", moneda: str = BASE_CURRENCY):
+    """Busca vuelos enviando cada resultado en cuanto está disponible"""
+    if formato not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="Formato no válido: usa 'ndjson' o 'sse'")
+    moneda = moneda.upper()
+    rates = currency_snapshot(moneda)
+    
+    error = validate_search(search)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    search.fecha = parse_search_date(search.fecha)
+    prefetcher.record(search.origen, search.destino)
+    
+    media_type = "text/event-stream" if formato == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_search(search, formato, rates, moneda),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def subscription_key(message: dict) -> Tuple[str, ...]:
+    """Clave de suscripción de un mensaje del cliente; ValueError si no es válida"""
+    numero_vuelo = str(message.get("numero_vuelo") or "").strip().upper()
+    if numero_vuelo:
+        if not FLIGHT_NUMBER.match(numero_vuelo):
+            raise ValueError(f"Número de vuelo no válido: {numero_vuelo}")
+        return ("vuelo", numero_vuelo)
+    search = FlightSearch(origen=str(message.get("origen", "")).upper(),
+                          destino=str(message.get("destino", "")).upper(), fecha="")
+    error = validate_search(search)
+    if error:
+        raise ValueError(error)
+    return ("ruta", search.origen, search.destino)
+
+@app.websocket("/ws/vuelos")
+async def ws_vuelos(websocket: WebSocket):
+    """Estado en vivo de rutas o vuelos: {"accion": "suscribir"|"cancelar", "origen", "destino"} o {"numero_vuelo"}"""
+    await websocket.accept()
+    client = LiveClient(websocket, WS_SEND_BUFFER)
+    live_hub.clients += 1
+    
+    async def receive():
+        while True:
+            text = await websocket.receive_text()
+            try:
+                try:
+                    message = json.loads(text)
+                except json.JSONDecodeError:
+                    raise ValueError("Mensaje JSON no válido")
+                if not isinstance(message, dict):
+                    raise ValueError("El mensaje debe ser un objeto JSON")
+                key = subscription_key(message)
+                accion = message.get("accion", "suscribir")
+                if accion == "suscribir":
+                    error = live_hub.subscribe(client, key)
+                elif accion == "cancelar":
+                    live_hub.unsubscribe(client, key)
+                    error = None
+                else:
+                    error = f"Acción no válida: {accion}"
+            except ValueError as e:
+                error = str(e)
+            if error:
+                # Mismo formato que el error del stream NDJSON: {"tipo": "error", "data": {"detail": ...}}
+                client.send(format_stream_event("error", json.dumps({"detail": error}), "ndjson").rstrip("\n"))
+    
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(client.run_sender())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        live_hub.disconnect(client)
+        live_hub.clients -= 1
+
+@app.post("/buscar-vuelos/lote", responses={200: {"model": BatchResponse}})
+async def buscar_vuelos_lote(busquedas: List[FlightSearch], moneda: str = BASE_CURRENCY):
+    """Resuelve varias búsquedas en una sola petición"""
+    if len(busquedas) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Máximo {BATCH_MAX_SIZE} búsquedas por lote")
+    moneda = moneda.upper()
+    rates = currency_snapshot(moneda)
+    
+    # Deduplicar rutas idénticas conservando el orden de llegada
+    unique = {}
+    for search in busquedas:
+        unique.setdefault((search.origen, search.destino, search.fecha, search.adultos), search)
+    
+    errors = {}
+    real = {}
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    
+    async def lookup(key, search):
+        async with semaphore:
+            try:
+                real[key] = await get_real_flights(search)
+            except Exception as e:
+                errors[key] = f"Error interno: {str(e)}"
+    
+    pending = []
+    for key, search in unique.items():
+        error = validate_search(search)
+        if not error:
+            # Misma comprobación de fecha que /buscar-vuelos: es un error del cliente, no interno
+            try:
+                parse_search_date(search.fecha)
+            except HTTPException as e:
+                error = e.detail
+        if error:
+            errors[key] = error
+        else:
+            prefetcher.record(search.origen, search.destino)
+            pending.append(lookup(key, search))
+    await asyncio.gather(*pending)
+    
+    # Completar todas las rutas con simulados en una sola pasada
+    valid = [key for key in unique if key not in errors]
+    mocks = build_mock_flights_bulk(
+        [unique[key] for key in valid],
+        [mock_flights_needed(real[key]) for key in valid]
+    )
+    mocks = dict(zip(valid, mocks))
+    merged = {key: sorted(merge_flights(real[key], unique[key], mocks[key]), key=lambda x: x.precio) for key in valid}
+    apply_currency([flight for vuelos in merged.values() for flight in vuelos], rates, moneda)
+    
+    results = {}
+    for key, search in unique.items():
+        if key in errors:
+            results[key] = build(
+                BatchResult,
+                origen=search.origen, destino=search.destino, fecha=search.fecha,
+                success=False, estado="error", error=errors[key]
+            )
+        else:
+            vuelos = merged[key]
+            results[key] = build(
+                BatchResult,
+                origen=search.origen, destino=search.destino, fecha=search.fecha,
+                success=True, estado="ok", vuelos=vuelos, total=len(vuelos)
+            )
+    
+    return respond(build(
+        BatchResponse,
+        success=not errors,
+        resultados=[results[(s.origen, s.destino, s.fecha, s.adultos)] for s in busquedas],
+        total_busquedas=len(busquedas),
+        rutas_unicas=len(unique),
+        fecha_busqueda=datetime.now().isoformat()
+    ))
+
+def fare_matrix(origen: str, destino: str, fechas: List[str]) -> np.ndarray:
+    """Precios USD aerolíneas × días en una sola pasada (mismas tarifas que /buscar-vuelos)"""
+    seeds = fare_simulator.route_seeds([(origen, destino, fecha) for fecha in fechas])
+    return fare_simulator.price_grid(seeds, aviation_client._base_price(origen, destino))
+
+@app.get("/calendario-precios")
+async def calendario_precios(origen: str, destino: str, desde: str, hasta: Optional[str] = None,
+                             moneda: str = BASE_CURRENCY):
+    """Precio mínimo y mediano por día para un rango de fechas"""
+    error = validate_search(FlightSearch(origen=origen, destino=destino, fecha=desde))
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    moneda = moneda.upper()
+    rates = currency_snapshot(moneda)
+    
+    try:
+        start = datetime.strptime(desde, '%Y-%m-%d')
+        end = datetime.strptime(hasta, '%Y-%m-%d') if hasta else start + timedelta(days=30)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Fecha no válida: {str(e)}")
+    
+    num_days = (end - start).days + 1
+    if num_days < 1:
+        raise HTTPException(status_code=400, detail="'hasta' debe ser igual o posterior a 'desde'")
+    if num_days > CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Máximo {CALENDAR_MAX_DAYS} días por calendario")
+    
+    fechas = [(start + timedelta(days=day)).strftime('%Y-%m-%d') for day in range(num_days)]
+    prices = fare_matrix(origen, destino, fechas)
+    cheapest = prices.argmin(axis=0)
+    minimums = prices[cheapest, np.arange(num_days)]
+    medians = np.median(prices, axis=0)
+    
+    dias = []
+    for day, fecha in enumerate(fechas):
+        dia = {
+            "fecha": fecha,
+            "precio_min": float(minimums[day]),
+            "precio_mediana": round(float(medians[day]), 2),
+            "aerolinea_min": AIRLINE_NAMES[cheapest[day]],
+            "datos_reales": False
+        }
+        
+        # Mezclar días con datos reales ya en caché (sin gastar cuota)
+        cached = route_cache.get((origen, destino, fecha))
+        if cached is None:
+            board = board_cache.get((origen, fecha))
+            cached = board.get(destino) if board else None
+        if cached:
+            real = [f for f in map(aviation_client.convert_to_our_format, cached[:REAL_FLIGHTS_PER_ROUTE]) if f]
+            if real:
+                best = min(real, key=lambda f: f.precio)
+                if best.precio < dia["precio_min"]:
+                    dia["precio_min"] = best.precio
+                    dia["aerolinea_min"] = best.aerolinea
+                dia["datos_reales"] = True
+        
+        dias.append(dia)
+    
+    # Conversión de todo el calendario de una vez
+    if moneda != BASE_CURRENCY:
+        converted_min = rates.convert([dia["precio_min"] for dia in dias], moneda).tolist()
+        converted_median = rates.convert(medians, moneda).tolist()
+        for dia, precio_min, precio_mediana in zip(dias, converted_min, converted_median):
+            dia["precio_min"] = precio_min
+            dia["precio_mediana"] = precio_mediana
+    
+    mas_barato = min(dias, key=lambda d: d["precio_min"])
+    return {
+        "origen": origen,
+        "destino": destino,
+        "desde": start.strftime('%Y-%m-%d'),
+        "hasta": end.strftime('%Y-%m-%d'),
+        "moneda": moneda,
+        "dias": dias,
+        "mas_barato": mas_barato,
+        "total": len(dias)
+    }
+
+@app.get("/historial-precios")
+async def historial_precios(origen: str, destino: str, desde: Optional[str] = None, hasta: Optional[str] = None,
+                            fuente: Optional[str] = None):
+    """Evolución del precio de una ruta: mínimo, media y percentiles por día"""
+    if fare_history is None:
+        raise HTTPException(status_code=503, detail="El histórico de tarifas no está activado")
+    
+    error = validate_search(FlightSearch(origen=origen, destino=destino, fecha=""))
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    try:
+        for fecha in (desde, hasta):
+            if fecha:
+                datetime.strptime(fecha, '%Y-%m-%d')
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Fecha no válida: {str(e)}")
+    
+    dias = await asyncio.to_thread(fare_history.trend, origen, destino, desde, hasta, fuente)
+    return {
+        "origen": origen,
+        "destino": destino,
+        "moneda": "USD",
+        "dias": dias,
+        "muestras": sum(dia["muestras"] for dia in dias),
+        "total": len(dias)
+    }
+
+@app.get("/itinerarios")
+async def get_itineraries(origen: str, destino: str, k: int = 5, max_escalas: int = 2):
+    """Itinerarios directos y con escalas ordenados por duración total"""
+    error = validate_search(FlightSearch(origen=origen, destino=destino, fecha=""))
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    k = max(1, min(k, 20))
+    max_escalas = max(0, min(max_escalas, 2))
+    opciones = itinerarios.find_itineraries(origen, destino, k=k, max_stops=max_escalas)
+    return {
+        "origen": origen,
+        "destino": destino,
+        "itinerarios": opciones,
+        "total": len(opciones)
+    }
+
 @app.get("/aeropuertos")
-async def get_airports():
+async def get_airports(request: Request, region: Optional[str] = None, pais: Optional[str] = None):
     """Obtiene lista de aeropuertos disponibles"""
+    view = await catalog.view(region, pais)
+    if view is None:
+        raise HTTPException(status_code=404, detail="No hay aeropuertos para los filtros indicados")
+    return view.response(request)
+
+@app.get("/aeropuertos/buscar")
+async def buscar_aeropuertos(q: str, limit: int = 10):
+    """Autocompletado de aeropuertos por código, nombre, ciudad o país"""
+    limit = max(1, min(limit, 50))
+    if not airport_index.built:
+        # La primera búsqueda construye el índice fuera del bucle de eventos; las demás la esperan
+        async with airport_index_lock:
+            if not airport_index.built:
+                await asyncio.to_thread(airport_index.build)
+    resultados = airport_index.search(q, limit)
     return {
-        "aeropuertos": AEROPUERTOS,
-        "total": len(AEROPUERTOS),
-        "aerolineas": AEROLINEAS,
-        "sitios_compra": SITIOS_COMPRA
+        "query": q,
+        "resultados": resultados,
+        "total": len(resultados)
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Métricas del worker en formato de exposición de Prometheus"""
+    return Response(metricas.REGISTRY.render(), media_type=metricas.CONTENT_TYPE)
+
 @app.get("/api-info")
 async def api_info():
     """Información detallada sobre la API y configuración"""
@@ -408,16 +1497,35 @@ async def api_info():
             "aviationstack": {
                 "configured": aviation_client.is_available(),
                 "monthly_limit": aviation_client.monthly_limit,
-                "requests_used": aviation_client.request_count,
+                "requests_used": aviation_client.usage(),
                 "plan": "Free" if aviation_client.is_available() else "None"
             },
-            "fallback": "Enhanced simulation with real airport data"
+            "fallback": "Enhanced simulation with real airport data",
+            "circuit_breakers": {name: breaker.stats() for name, breaker in aviation_client.breakers.items()},
+            "real_data_budget_ms": REAL_DATA_BUDGET_MS,
+            "multiworker": aviation_client.shared
         },
+        "cache": route_cache.stats(),
+        "search_results": search_results.stats(),
+        "departure_boards": {"mode": UPSTREAM_FETCH_MODE, **board_cache.stats()},
+        "admission": admission.stats(),
+        "locations": location_resolver.stats(),
+        "prefetch": prefetcher.stats(),
+        "live_subscriptions": live_hub.stats(),
+        "currencies": currency_engine.stats(),
+        "catalog": catalog.stats(),
+        "airport_index": airport_index.stats(),
+        "store": response_store.stats() if response_store is not None else None,
+        "fare_history": fare_history.stats() if fare_history is not None else None,
         "features": {
             "worldwide_airports": len(AEROPUERTOS),
             "usd_pricing": True,
+            "multi_currency": True,
             "flight_numbers": True,
             "purchase_links": True,
+            "multi_airport_search": True,
+            "server_side_filters": True,
+            "fast_serialization": FAST_SERIALIZATION,
             "real_time_data": aviation_client.is_available()
         },
         "configuration": {
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark del coste de CPU por petición de /buscar-vuelos y del lote
+Llama a app_vuelos_real_api.app en el mismo proceso a través del transporte
+ASGI de httpx (sin red ni upstream: fechas futuras, solo simulados) y mide
+el tiempo de CPU por petición con la serialización Pydantic estándar y con
+la ruta rápida (FAST_SERIALIZATION: registros con slots + orjson).
+
+Uso:
+    python bench_serializacion.py --peticiones 500 --lote 20 --salida bench_serializacion.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+
+def scenarios(batch_size: int) -> dict:
+    """Cuerpos de petición de cada escenario"""
+    fecha = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    routes = [("MAD", "BCN"), ("CDG", "JFK"), ("LHR", "DXB"), ("MAD", "SYD"), ("GRU", "MIA")]
+    lote = []
+    for i in range(batch_size):
+        origen, destino = routes[i % len(routes)]
+        dia = (datetime.now() + timedelta(days=30 + i)).strftime('%Y-%m-%d')
+        lote.append({"origen": origen, "destino": destino, "fecha": dia})
+    return {
+        "buscar": ("/buscar-vuelos", {"origen": "MAD", "destino": "SYD", "fecha": fecha}),
+        "buscar_ciudad": ("/buscar-vuelos", {"origen": "LON", "destino": "NYC", "fecha": fecha}),
+        "lote": ("/buscar-vuelos/lote", lote),
+    }
+
+
+async def measure(client: httpx.AsyncClient, path: str, body, requests: int) -> dict:
+    """CPU y tiempo de reloj por petición"""
+    for _ in range(min(20, requests)):
+        (await client.post(path, json=body)).raise_for_status()
+
+    cpu, wall = [], []
+    for _ in range(requests):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        response = await client.post(path, json=body)
+        cpu.append(time.process_time() - cpu_start)
+        wall.append(time.perf_counter() - wall_start)
+        response.raise_for_status()
+    return {
+        "cpu_ms": round(statistics.fmean(cpu) * 1000, 3),
+        "wall_p50_ms": round(statistics.median(wall) * 1000, 3),
+        "bytes": len(response.content),
+    }
+
+
+async def run(requests: int, batch_size: int) -> dict:
+    import app_vuelos_real_api
+
+    app = app_vuelos_real_api.app
+    await app.router.startup()
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, (path, body) in scenarios(batch_size).items():
+                results[name] = {}
+                for mode, fast in (("pydantic", False), ("rapida", True)):
+                    app_vuelos_real_api.FAST_SERIALIZATION = fast
+                    results[name][mode] = await measure(client, path, body, requests)
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=300, help="Peticiones medidas por escenario y modo")
+    parser.add_argument("--lote", type=int, default=20, help="Búsquedas por petición de lote")
+    parser.add_argument("--salida", default="", help="Fichero JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    # Sin clave ni almacén: solo se mide la generación y la serialización
+    os.environ["AVIATIONSTACK_API_KEY"] = "YOUR_API_KEY_HERE"
+    os.environ["RESPONSE_STORE_PATH"] = ""
+    os.environ["FARE_HISTORY_PATH"] = ""
+    os.environ["RATE_LIMIT_PER_SECOND"] = "0"
+
+    results = asyncio.run(run(args.peticiones, args.lote))
+
+    print(f"{'escenario':<16}{'pydantic ms':>14}{'rápida ms':>12}{'ahorro':>9}{'bytes':>9}")
+    for name, modes in results.items():
+        slow, fast = modes["pydantic"]["cpu_ms"], modes["rapida"]["cpu_ms"]
+        saving = f"{(1 - fast / slow) * 100:.0f}%" if slow else "-"
+        print(f"{name:<16}{slow:>14}{fast:>12}{saving:>9}{modes['rapida']['bytes']:>9}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"fecha": datetime.now().isoformat(), "parametros": vars(args), "escenarios": results},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
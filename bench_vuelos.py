@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmark de carga y latencia de las APIs de vuelos
+Arranca en el mismo proceso app_vuelos_real_api.app, app_render_simple.app
+y un AviationStack falso con latencia, tasa de error y tamaño de payload
+configurables. Reproduce una mezcla realista de peticiones (rutas calientes,
+hoy frente a fechas futuras, aeropuertos no válidos, catálogo) y mide el
+throughput y los percentiles p50/p95/p99 por endpoint. El resultado se
+guarda en JSON para comparar regresiones entre commits.
+
+Uso:
+    python bench_vuelos.py --latencia 0.5 --error-rate 0.1 --peticiones 2000 \\
+        --concurrencia 50 --salida bench_output.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+HOT_ROUTES = [("MAD", "BCN"), ("MAD", "LHR"), ("JFK", "LAX"), ("CDG", "JFK"), ("LHR", "DXB")]
+# Destinos del panel de salidas que sirve el upstream simulado
+BOARD_DESTINATIONS = sorted({code for route in HOT_ROUTES for code in route} | {"FCO", "AMS", "MIA", "GRU", "SYD"})
+AUTOCOMPLETE_QUERIES = ["mad", "lon", "sao", "nueva", "GRU", "tok", "par", "b"]
+
+# Mezcla de escenarios: (nombre, peso)
+SCENARIO_MIX = [
+    ("buscar_hoy_caliente", 30),
+    ("buscar_hoy_fria", 10),
+    ("buscar_futura", 20),
+    ("buscar_invalida", 5),
+    ("buscar_lote", 5),
+    ("calendario", 5),
+    ("aeropuertos", 10),
+    ("aeropuertos_buscar", 8),
+    ("health", 4),
+    ("simple_buscar", 3),
+]
+
+
+def free_port() -> int:
+    """Reserva un puerto TCP libre en localhost"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StubStats:
+    """Contadores del upstream simulado"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+
+
+def create_stub_app(latency: float, error_rate: float, payload_size: int, stats: StubStats, seed: int) -> FastAPI:
+    """AviationStack falso: responde /v1/flights tras `latency` segundos"""
+    stub = FastAPI()
+    rng = random.Random(seed)
+
+    @stub.get("/v1/flights")
+    async def flights(dep_iata: str = "MAD", arr_iata: str = "", flight_date: str = "",
+                      limit: int = 100, offset: int = 0):
+        stats.calls += 1
+        await asyncio.sleep(latency)
+        if rng.random() < error_rate:
+            stats.errors += 1
+            return JSONResponse(status_code=500, content={"error": {"code": "internal_error"}})
+        # Sin arr_iata es un panel de salidas: `payload_size` vuelos a cada destino de la lista
+        destinations = [arr_iata] if arr_iata else [code for code in BOARD_DESTINATIONS if code != dep_iata]
+        total = payload_size * len(destinations)
+        page = range(offset, min(total, offset + min(limit, 100)))
+        return {
+            "pagination": {"limit": limit, "offset": offset, "count": len(page), "total": total},
+            "data": [
+                {
+                    "flight_date": flight_date,
+                    "flight_status": "scheduled",
+                    "departure": {"iata": dep_iata, "gate": f"A{i % 40}", "delay": None},
+                    "arrival": {"iata": destinations[i // payload_size]},
+                    "airline": {"name": "Iberia", "iata": "IB"},
+                    "flight": {"iata": f"IB{100 + i}", "number": str(100 + i)},
+                }
+                for i in page
+            ]
+        }
+
+    return stub
+
+
+class ServerThread(threading.Thread):
+    """Servidor uvicorn en un hilo de fondo"""
+
+    def __init__(self, app, port: int):
+        super().__init__(daemon=True)
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.server.install_signal_handlers = lambda: None
+
+    def run(self):
+        self.server.run()
+
+    def wait_started(self, timeout: float = 10.0):
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("El servidor no arrancó a tiempo")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join()
+
+
+def percentile(values, pct: float) -> float:
+    """Percentil por rango más cercano"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def build_requests(total: int, seed: int, airports: list):
+    """Secuencia reproducible de (escenario, app, método, ruta, kwargs)"""
+    rng = random.Random(seed)
+    names = [name for name, _ in SCENARIO_MIX]
+    weights = [weight for _, weight in SCENARIO_MIX]
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    def future_date():
+        return (datetime.now() + timedelta(days=rng.randint(2, 120))).strftime('%Y-%m-%d')
+
+    def random_route():
+        origen, destino = rng.sample(airports, 2)
+        return origen, destino
+
+    plan = []
+    for name in rng.choices(names, weights, k=total):
+        if name == "buscar_hoy_caliente":
+            origen, destino = rng.choice(HOT_ROUTES)
+            plan.append((name, "real", "POST", "/buscar-vuelos", {"json": {"origen": origen, "destino": destino, "fecha": today}}))
+        elif name == "buscar_hoy_fria":
+            origen, destino = random_route()
+            plan.append((name, "real", "POST", "/buscar-vuelos", {"json": {"origen": origen, "destino": destino, "fecha": today}}))
+        elif name == "buscar_futura":
+            origen, destino = random_route()
+            plan.append((name, "real", "POST", "/buscar-vuelos", {"json": {"origen": origen, "destino": destino, "fecha": future_date()}}))
+        elif name == "buscar_invalida":
+            plan.append((name, "real", "POST", "/buscar-vuelos", {"json": {"origen": "XXX", "destino": "MAD", "fecha": today}}))
+        elif name == "buscar_lote":
+            body = []
+            for _ in range(rng.randint(5, 20)):
+                origen, destino = random_route()
+                body.append({"origen": origen, "destino": destino, "fecha": rng.choice([today, future_date()])})
+            plan.append((name, "real", "POST", "/buscar-vuelos/lote", {"json": body}))
+        elif name == "calendario":
+            origen, destino = random_route()
+            params = {"origen": origen, "destino": destino, "desde": today,
+                      "hasta": (datetime.now() + timedelta(days=89)).strftime('%Y-%m-%d')}
+            plan.append((name, "real", "GET", "/calendario-precios", {"params": params}))
+        elif name == "aeropuertos":
+            plan.append((name, "real", "GET", "/aeropuertos", {"headers": {"accept-encoding": "gzip, br"}}))
+        elif name == "aeropuertos_buscar":
+            plan.append((name, "real", "GET", "/aeropuertos/buscar", {"params": {"q": rng.choice(AUTOCOMPLETE_QUERIES)}}))
+        elif name == "health":
+            plan.append((name, "real", "GET", "/health", {}))
+        elif name == "simple_buscar":
+            origen, destino = random_route()
+            plan.append((name, "simple", "POST", "/buscar-vuelos", {"json": {"origen": origen, "destino": destino, "fecha": today}}))
+    return plan
+
+
+async def run_load(base_urls: dict, plan: list, concurrency: int) -> dict:
+    """Ejecuta el plan con `concurrency` clientes simultáneos"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        async def worker():
+            while True:
+                try:
+                    name, app_name, method, path, kwargs = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, base_urls[app_name] + path, **kwargs)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies[name].append(time.perf_counter() - started)
+                statuses[name][status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name, values in sorted(latencies.items()):
+        endpoints[name] = {
+            "peticiones": len(values),
+            "status": dict(statuses[name]),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(max(values) * 1000, 2),
+        }
+    return {
+        "peticiones": len(plan),
+        "segundos": round(elapsed, 3),
+        "throughput_rps": round(len(plan) / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+
+def git_commit() -> str:
+    """Commit actual, para etiquetar el resultado"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latencia", type=float, default=0.5, help="Latencia del upstream simulado (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 500 del upstream")
+    parser.add_argument("--payload", type=int, default=10, help="Vuelos por respuesta del upstream")
+    parser.add_argument("--peticiones", type=int, default=1000)
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--modo-descarga", choices=["ruta", "salidas"], default="ruta",
+                        help="Petición por ruta o panel de salidas por origen (UPSTREAM_FETCH_MODE)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de la mezcla de peticiones")
+    parser.add_argument("--salida", default="", help="Fichero JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    store_dir = tempfile.mkdtemp(prefix="bench_vuelos_")
+    os.environ["AVIATIONSTACK_API_KEY"] = "bench"
+    os.environ["AVIATIONSTACK_BASE_URL"] = f"http://127.0.0.1:{stub_port}/v1"
+    os.environ["RESPONSE_STORE_PATH"] = os.path.join(store_dir, "store.sqlite3")
+    os.environ["FARE_HISTORY_PATH"] = os.path.join(store_dir, "historial_precios")
+    os.environ.setdefault("AVIATIONSTACK_MAX_CONNECTIONS", str(args.concurrencia))
+    os.environ["UPSTREAM_FETCH_MODE"] = args.modo_descarga
+    # Todo el tráfico sale de la misma IP: sin límite por cliente
+    os.environ.setdefault("RATE_LIMIT_PER_SECOND", "0")
+
+    # Importar después de configurar el entorno para que el cliente apunte al stub
+    import app_render_simple
+    import app_vuelos_real_api
+
+    app_vuelos_real_api.aviation_client.monthly_limit = 10 ** 9
+
+    stub_stats = StubStats()
+    stub = ServerThread(create_stub_app(args.latencia, args.error_rate, args.payload, stub_stats, args.seed), stub_port)
+    real_port, simple_port = free_port(), free_port()
+    servers = [stub, ServerThread(app_vuelos_real_api.app, real_port), ServerThread(app_render_simple.app, simple_port)]
+    for server in servers:
+        server.start()
+    for server in servers:
+        server.wait_started()
+
+    plan = build_requests(args.peticiones, args.seed, list(app_vuelos_real_api.AEROPUERTOS))
+    base_urls = {"real": f"http://127.0.0.1:{real_port}", "simple": f"http://127.0.0.1:{simple_port}"}
+    try:
+        result = asyncio.run(run_load(base_urls, plan, args.concurrencia))
+    finally:
+        for server in reversed(servers):
+            server.stop()
+
+    report = {
+        "commit": git_commit(),
+        "fecha": datetime.now().isoformat(),
+        "parametros": vars(args),
+        "upstream": {"llamadas": stub_stats.calls, "errores": stub_stats.errors},
+        **result,
+    }
+
+    print(f"{'escenario':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  status")
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<22}{stats['peticiones']:>6}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}  {stats['status']}")
+    print(f"throughput: {report['throughput_rps']} req/s en {report['segundos']} s; "
+          f"upstream: {stub_stats.calls} llamadas, {stub_stats.errors} errores")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
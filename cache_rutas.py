@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Caché en memoria de respuestas de AviationStack por ruta y fecha
+TTL configurable, expulsión LRU acotada, caché negativa de resultados
+vacíos o erróneos y coalescencia de búsquedas idénticas concurrentes.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class RouteCache:
+    """Caché LRU con TTL y single-flight para llamadas al upstream"""
+
+    def __init__(self, ttl: float = 300, negative_ttl: float = 60, max_entries: int = 1024):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, List[dict]]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable):
+        """Devuelve el valor vigente o None si no existe o ha caducado"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: List[dict], ttl: Optional[float] = None):
+        """Guarda un valor; los resultados vacíos usan el TTL negativo"""
+        if ttl is None:
+            ttl = self.ttl if value else self.negative_ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[List[dict]]],
+                           ttl: Optional[float] = None) -> List[dict]:
+        """Devuelve el valor cacheado o lo obtiene una sola vez para todos los que esperan"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            print(f"Error al obtener ruta {key}: {e}")
+            value = []
+        finally:
+            self._inflight.pop(key, None)
+
+        self.set(key, value, ttl if value else None)
+        future.set_result(value)
+        return value
+
+    def stats(self) -> dict:
+        """Contadores para /api-info"""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "negative_ttl_seconds": self.negative_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Catálogo estático de aeropuertos pre-serializado
+Los bytes JSON, sus variantes gzip/brotli y el ETag se calculan una sola
+vez por cada vista (completa, por región, por país), la primera vez que
+se pide, de modo que servir /aeropuertos no vuelve a serializar nada.
+Crear el catálogo no recorre la tabla: eso también espera a la primera vista.
+Con decenas de miles de aeropuertos codificar una vista cuesta segundos, así
+que se hace en un hilo y las peticiones simultáneas esperan la misma tarea.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from indice_aeropuertos import normalize
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se sirve gzip
+    brotli = None
+
+CACHE_CONTROL = "public, max-age=300"
+
+# Brotli 11 comprime un ~20% más que 9 pero es ~30 veces más lento: solo para cuerpos pequeños
+BROTLI_MAX_QUALITY_BYTES = 256 * 1024
+
+
+class EncodedBody:
+    """Cuerpo JSON con sus variantes comprimidas y su ETag"""
+
+    def __init__(self, payload: dict):
+        self.identity = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.identity).hexdigest()[:32] + '"'
+        self.encoded = {"gzip": gzip.compress(self.identity, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            quality = 11 if len(self.identity) <= BROTLI_MAX_QUALITY_BYTES else 9
+            self.encoded["br"] = brotli.compress(self.identity, quality=quality)
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True si el cliente ya tiene esta versión"""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == self.etag:
+                return True
+        return False
+
+    def response(self, request: Request) -> Response:
+        """Respuesta 304 o el cuerpo en la mejor codificación aceptada"""
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+
+        accepted = {
+            part.split(";")[0].strip().lower()
+            for part in request.headers.get("accept-encoding", "").split(",")
+        }
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.encoded:
+                headers["Content-Encoding"] = encoding
+                return Response(self.encoded[encoding], media_type="application/json", headers=headers)
+        return Response(self.identity, media_type="application/json", headers=headers)
+
+
+ViewKey = Tuple[Optional[str], Optional[str]]
+
+
+class Catalog:
+    """Vistas del catálogo de aeropuertos, codificadas la primera vez que se piden"""
+
+    def __init__(self, airports: Mapping[str, dict], airlines: dict, sites: dict):
+        self.airports = airports
+        self.airlines = airlines
+        self.sites = sites
+        self._views: Dict[ViewKey, EncodedBody] = {}
+        self._pending: Dict[ViewKey, asyncio.Future] = {}
+        # Aeropuertos de cada vista; se reparte la tabla la primera vez que se pide una
+        self._slices: Optional[Dict[ViewKey, List[str]]] = None
+        self._lock = threading.Lock()
+
+    def slices(self) -> Dict[ViewKey, List[str]]:
+        with self._lock:
+            if self._slices is None:
+                slices: Dict[ViewKey, List[str]] = {}
+                for code in self.airports:
+                    info = self.airports[code]
+                    region = normalize(info.get("region", ""))
+                    pais = normalize(info.get("pais", ""))
+                    for key in ((None, None), (region, None), (None, pais), (region, pais)):
+                        slices.setdefault(key, []).append(code)
+                self._slices = slices
+        return self._slices
+
+    async def view(self, region: Optional[str] = None, pais: Optional[str] = None) -> Optional[EncodedBody]:
+        """Vista para los filtros dados, o None si no hay aeropuertos que coincidan"""
+        key = (normalize(region) if region else None, normalize(pais) if pais else None)
+        body = self._views.get(key)
+        if body is not None or (self._slices is not None and key not in self._slices):
+            return body
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(asyncio.to_thread(self._encode, key))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        # shield: si se cancela la petición que la lanzó, las demás siguen esperando la misma tarea
+        return await asyncio.shield(pending)
+
+    def _encode(self, key: ViewKey) -> Optional[EncodedBody]:
+        codes = self.slices().get(key)
+        if codes is None:
+            return None
+        body = self._views[key] = EncodedBody({
+            "aeropuertos": {code: self.airports[code] for code in codes},
+            "total": len(codes),
+            "aerolineas": self.airlines,
+            "sitios_compra": self.sites,
+        })
+        return body
+
+    def stats(self) -> dict:
+        """Tamaño de las vistas ya codificadas (nunca fuerza una codificación)"""
+        full = self._views.get((None, None))
+        return {
+            "views": len(self._slices) if self._slices is not None else None,
+            "views_encoded": len(self._views),
+            "bytes": len(full.identity) if full else None,
+            "bytes_gzip": len(full.encoded["gzip"]) if full else None,
+            "bytes_br": len(full.encoded["br"]) if full and "br" in full.encoded else None,
+        }
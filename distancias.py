@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Distancias ortodrómicas entre aeropuertos
+Con decenas de miles de aeropuertos una matriz n×n no cabe en memoria:
+se guardan las coordenadas en radianes y la región de cada aeropuerto y
+la haversine se evalúa vectorizada sobre los pares (o filas) pedidos.
+Estas columnas y la rejilla espacial se calculan la primera vez que se
+usan, no al importar el módulo.
+"""
+
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from aeropuertos_data import AEROPUERTOS_MUNDIALES
+
+EARTH_RADIUS_KM = 6371.0
+
+# Tiempo de bloque aproximado: rodaje/ascenso fijos + crucero a ~880 km/h
+BLOCK_OVERHEAD_MIN = 40
+CRUISE_MIN_PER_KM = 0.068
+
+# Lado de las celdas de la rejilla espacial, en grados
+GRID_CELL_DEG = 5.0
+
+# Tarifa base por distancia (USD)
+FARE_BASE_USD = 40.0
+FARE_PER_KM_USD = 0.09
+
+# Precio base por región de la ruta, de mayor a menor prioridad
+REGION_BASE_PRICES = {
+    'Europa': 150,
+    'America_Norte': 400,
+    'Asia': 800,
+    'America_Sur': 600,
+    'Africa': 500,
+    'Oceania': 900,
+}
+REGION_NAMES = list(REGION_BASE_PRICES)
+
+# Regiones de aeropuertos_data -> regiones de precio
+_REGION_MAP = {
+    'Europa': 'Europa',
+    'América del Norte': 'America_Norte',
+    'América del Sur': 'America_Sur',
+    'Asia': 'Asia',
+    'Medio Oriente': 'Asia',
+    'África': 'Africa',
+    'Oceanía': 'Oceania',
+}
+
+
+class _Geometry:
+    """Columnas derivadas de la tabla de aeropuertos"""
+
+    def __init__(self):
+        lat = np.radians(AEROPUERTOS_MUNDIALES.lat)
+        lon = np.radians(AEROPUERTOS_MUNDIALES.lon)
+        self.lat = lat
+        self.lon = lon
+        self.cos_lat = np.cos(lat)
+        # Vectores unitarios: el coseno del ángulo central entre dos aeropuertos es su
+        # producto escalar, así que comparar bloques enteros es una multiplicación de matrices
+        self.unit_vectors = np.stack([self.cos_lat * np.cos(lon), self.cos_lat * np.sin(lon), np.sin(lat)], axis=1)
+        # La región de la ruta es la de mayor prioridad entre origen y destino
+        category_region = np.array(
+            [REGION_NAMES.index(_REGION_MAP.get(name, 'Europa')) for name in AEROPUERTOS_MUNDIALES.categories],
+            dtype=np.int8
+        )
+        self.region = category_region[AEROPUERTOS_MUNDIALES.region]
+
+
+@lru_cache(maxsize=None)
+def _geometry() -> _Geometry:
+    return _Geometry()
+
+
+_region_price = np.array([REGION_BASE_PRICES[r] for r in REGION_NAMES], dtype=np.float32)
+
+
+def distance_ids(i, j) -> np.ndarray:
+    """Distancias en km entre ids (escalares o arrays que se difunden)"""
+    g = _geometry()
+    i, j = np.asarray(i), np.asarray(j)
+    a = np.sin((g.lat[i] - g.lat[j]) / 2) ** 2 + g.cos_lat[i] * g.cos_lat[j] * np.sin((g.lon[i] - g.lon[j]) / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))).astype(np.float32)
+
+
+def duration_ids(i, j) -> np.ndarray:
+    """Duración del vuelo directo en minutos entre ids"""
+    return np.rint(BLOCK_OVERHEAD_MIN + distance_ids(i, j) * CRUISE_MIN_PER_KM).astype(np.int32)
+
+
+def region_ids(i, j) -> np.ndarray:
+    """Índice en REGION_NAMES de la región de precio entre ids"""
+    region = _geometry().region
+    return np.minimum(region[np.asarray(i)], region[np.asarray(j)])
+
+
+def base_price_ids(i, j) -> np.ndarray:
+    """Precio base en USD entre ids"""
+    return np.maximum(_region_price[region_ids(i, j)], FARE_BASE_USD + distance_ids(i, j) * FARE_PER_KM_USD)
+
+
+def closeness_ids(rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """Matriz filas × columnas del coseno del ángulo central (mayor = más cerca)"""
+    unit_vectors = _geometry().unit_vectors
+    return unit_vectors[rows] @ unit_vectors[cols].T
+
+
+def closeness_threshold(km: float) -> float:
+    """Coseno del ángulo central equivalente a `km`"""
+    return float(np.cos(km / EARTH_RADIUS_KM))
+
+
+class SpatialGrid:
+    """Rejilla lat/lon de celdas fijas: candidatos por radio sin recorrer toda la tabla"""
+
+    def __init__(self, lat_deg: np.ndarray, lon_deg: np.ndarray, cell_deg: float = GRID_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.rows = int(np.ceil(180 / cell_deg))
+        self.cols = int(np.ceil(360 / cell_deg))
+        lat_cell = np.clip(((np.asarray(lat_deg) + 90) // cell_deg).astype(np.int64), 0, self.rows - 1)
+        lon_cell = ((np.asarray(lon_deg) + 180) // cell_deg).astype(np.int64) % self.cols
+        self.cell = lat_cell * self.cols + lon_cell
+        self.order = np.argsort(self.cell, kind="stable")
+        self.starts = np.searchsorted(self.cell[self.order], np.arange(self.rows * self.cols + 1))
+
+    def cell_ids(self, cell: int) -> np.ndarray:
+        """Ids de los aeropuertos de una celda"""
+        return self.order[self.starts[cell]:self.starts[cell + 1]]
+
+    def occupied_cells(self) -> np.ndarray:
+        """Celdas con algún aeropuerto"""
+        return np.flatnonzero(np.diff(self.starts))
+
+    def candidates(self, cell: int, radius_km: float) -> np.ndarray:
+        """Ids que pueden estar a menos de `radius_km` de algún punto de la celda"""
+        angle = radius_km / EARTH_RADIUS_KM
+        row, col = divmod(int(cell), self.cols)
+        lat_lo = -90 + row * self.cell_deg - np.degrees(angle)
+        lat_hi = -90 + (row + 1) * self.cell_deg + np.degrees(angle)
+        row_lo = max(0, int((lat_lo + 90) // self.cell_deg))
+        row_hi = min(self.rows - 1, int((lat_hi + 90) // self.cell_deg))
+
+        # Separación máxima en longitud a la latitud más desfavorable de la celda
+        worst_lat = np.radians(min(90.0, max(abs(-90 + row * self.cell_deg), abs(-90 + (row + 1) * self.cell_deg))))
+        ratio = np.sin(angle) / np.cos(worst_lat) if worst_lat < np.pi / 2 else np.inf
+        if angle >= np.pi / 2 or ratio >= 1:
+            cols = range(self.cols)
+        else:
+            span = int(np.ceil(np.degrees(np.arcsin(ratio)) / self.cell_deg))
+            cols = range(self.cols) if 2 * span + 1 >= self.cols else \
+                [(col + offset) % self.cols for offset in range(-span, span + 1)]
+
+        parts = [self.cell_ids(r * self.cols + c) for r in range(row_lo, row_hi + 1) for c in cols]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def within(self, i: int, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids (sin incluir `i`) y distancias de los aeropuertos a menos de `radius_km`"""
+        ids = self.candidates(self.cell[i], radius_km)
+        distances = distance_ids(i, ids)
+        keep = (distances <= radius_km) & (ids != i)
+        return ids[keep], distances[keep]
+
+
+@lru_cache(maxsize=None)
+def spatial_grid() -> SpatialGrid:
+    """Rejilla de toda la tabla, construida la primera vez que se pide"""
+    return SpatialGrid(AEROPUERTOS_MUNDIALES.lat, AEROPUERTOS_MUNDIALES.lon)
+
+
+def airport_id(code: str) -> Optional[int]:
+    """Id entero de un aeropuerto, o None si no está en la tabla"""
+    return AEROPUERTOS_MUNDIALES.id(code)
+
+
+def distance_km(dep_iata: str, arr_iata: str) -> Optional[float]:
+    """Distancia ortodrómica en km"""
+    i, j = airport_id(dep_iata), airport_id(arr_iata)
+    if i is None or j is None:
+        return None
+    return float(distance_ids(i, j))
+
+
+def duration_minutes(dep_iata: str, arr_iata: str) -> Optional[int]:
+    """Duración estimada del vuelo directo en minutos"""
+    i, j = airport_id(dep_iata), airport_id(arr_iata)
+    if i is None or j is None:
+        return None
+    return int(duration_ids(i, j))
+
+
+def route_region(dep_iata: str, arr_iata: str) -> Optional[str]:
+    """Región de precio de la ruta"""
+    i, j = airport_id(dep_iata), airport_id(arr_iata)
+    if i is None or j is None:
+        return None
+    return REGION_NAMES[region_ids(i, j)]
+
+
+def base_price(dep_iata: str, arr_iata: str) -> Optional[float]:
+    """Precio base en USD antes de aerolínea y variación"""
+    i, j = airport_id(dep_iata), airport_id(arr_iata)
+    if i is None or j is None:
+        return None
+    return float(base_price_ids(i, j))
+
+
+def distances_from(code: str) -> Dict[str, float]:
+    """Distancias desde un aeropuerto a todos los demás, de menor a mayor"""
+    i = airport_id(code)
+    if i is None:
+        return {}
+    codes = AEROPUERTOS_MUNDIALES.codes
+    row = distance_ids(i, np.arange(len(codes)))
+    return {codes[j]: float(row[j]) for j in np.argsort(row) if j != i}
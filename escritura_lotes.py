@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Escritura diferida por lotes
+Los almacenes en disco encolan lo que hay que escribir y un hilo de fondo
+lo vacía por lotes: espera `flush_interval` al primer elemento y se lleva
+de una vez todo lo demás que haya en la cola. None en la cola es la señal
+de parada: el lote en curso se entrega igualmente antes de terminar.
+"""
+
+import queue
+from typing import Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def drain_batches(items: "queue.Queue[Optional[T]]", flush_interval: float) -> Iterator[List[T]]:
+    """Lotes de la cola hasta recibir None; los lotes vacíos marcan un intervalo sin datos"""
+    running = True
+    while running:
+        try:
+            item = items.get(timeout=flush_interval)
+        except queue.Empty:
+            item = ()
+        batch = []
+        while True:
+            if item is None:
+                running = False
+            elif item:
+                batch.append(item)
+            try:
+                item = items.get_nowait()
+            except queue.Empty:
+                break
+        yield batch
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Histórico de tarifas en columnas, solo de escritura por anexado
+Cada tarifa calculada o recibida se encola y un hilo de fondo la anexa por
+lotes a ficheros de columnas (ruta, fecha, aerolínea, precio, fuente) de la
+partición del día. Las cadenas se guardan una vez en diccionarios (una
+cadena JSON por línea) y las filas solo llevan sus ids. Al cambiar de día
+la partición anterior se cierra: sus filas se ordenan por ruta y se
+escribe un índice ruta -> rango, de modo que una consulta lee con memmap
+solo el tramo de su ruta.
+"""
+
+import json
+import os
+import queue
+import shutil
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from escritura_lotes import drain_batches
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock de fichero, el histórico es de un solo worker
+    fcntl = None
+
+# Columnas de cada partición y su tipo en disco
+COLUMNS = {
+    "ruta": np.uint32,
+    "fecha": np.int32,      # días desde 1970-01-01 de la fecha del vuelo
+    "aerolinea": np.uint16,
+    "precio": np.float32,   # USD
+    "fuente": np.uint8,
+}
+
+# Sufijos de las particiones cerradas y de las que se están cerrando
+SEALED_SUFFIX = ".cerrada"
+TMP_SUFFIX = ".tmp"
+
+PERCENTILES = (10, 50, 90)
+
+# Fila de entrada: (origen, destino, fecha, aerolínea, precio USD, fuente)
+FareRow = Tuple[str, str, str, str, float, str]
+
+
+class _Dictionary:
+    """Fichero de solo anexado con una cadena JSON por línea: el número de línea es el id
+
+    Cada valor va codificado en JSON para que un salto de línea dentro de
+    una cadena (p. ej. en el nombre de una aerolínea) no desplace los ids.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.values: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._offset = 0
+
+    def refresh(self):
+        """Lee las líneas completas que otro proceso haya añadido"""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].decode("utf-8").split("\n")[:-1]:
+            value = json.loads(line)
+            self.ids[value] = len(self.values)
+            self.values.append(value)
+        self._offset += end
+
+    def intern(self, values) -> np.ndarray:
+        """Ids de `values`, añadiendo al fichero los nuevos (con el lock tomado)"""
+        new = []
+        for value in values:
+            if value not in self.ids:
+                self.ids[value] = len(self.values)
+                self.values.append(value)
+                new.append(value)
+        if new:
+            data = "".join(json.dumps(value, ensure_ascii=False) + "\n" for value in new).encode("utf-8")
+            with open(self.path, "ab") as f:
+                f.write(data)
+            self._offset += len(data)
+        return np.fromiter((self.ids[value] for value in values), dtype=np.int64, count=len(values))
+
+    def migrate(self, legacy_path: str):
+        """Convierte un diccionario del formato anterior (texto, una cadena por línea)"""
+        if os.path.exists(self.path) or not os.path.exists(legacy_path):
+            return
+        with open(legacy_path, encoding="utf-8", newline="\n") as f:
+            lines = f.read().split("\n")[:-1]
+        tmp = self.path + TMP_SUFFIX
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            f.writelines(json.dumps(line, ensure_ascii=False) + "\n" for line in lines)
+        os.replace(tmp, self.path)
+        os.remove(legacy_path)
+
+
+def _column_path(partition: str, name: str) -> str:
+    return os.path.join(partition, f"{name}.bin")
+
+
+def _read_columns(partition: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """Columnas de una partición recortadas a las filas completas en todas ellas"""
+    sizes = {}
+    for name, dtype in COLUMNS.items():
+        try:
+            sizes[name] = os.path.getsize(_column_path(partition, name)) // np.dtype(dtype).itemsize
+        except FileNotFoundError:
+            sizes[name] = 0
+    rows = min(sizes.values())
+    if rows == 0:
+        return {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+    if mmap:
+        return {
+            name: np.memmap(_column_path(partition, name), dtype=dtype, mode="r", shape=(rows,))
+            for name, dtype in COLUMNS.items()
+        }
+    return {name: np.fromfile(_column_path(partition, name), dtype=dtype, count=rows) for name, dtype in COLUMNS.items()}
+
+
+class FareHistory:
+    """Histórico de tarifas particionado por día con escritura diferida por lotes"""
+
+    def __init__(self, root: str, max_age_days: float = 365, flush_interval: float = 1.0):
+        self.root = root
+        self.max_age_days = max_age_days
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Tuple[str, List[FareRow]]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._routes = _Dictionary(os.path.join(root, "rutas.jsonl"))
+        self._airlines = _Dictionary(os.path.join(root, "aerolineas.jsonl"))
+        self._sources = _Dictionary(os.path.join(root, "fuentes.jsonl"))
+        # Índice y columnas (memmap) de las particiones cerradas, que ya no cambian
+        self._sealed: Dict[str, Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]] = {}
+        # Los diccionarios y la caché los comparten el hilo escritor y las consultas
+        self._mutex = threading.Lock()
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.batches_written = 0
+        self.partitions_sealed = 0
+
+    def open(self):
+        """Crea el directorio y arranca el hilo escritor (que cierra las particiones pendientes)"""
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock():
+            for dictionary in (self._routes, self._airlines, self._sources):
+                dictionary.migrate(dictionary.path[:-len(".jsonl")] + ".txt")
+        self._thread = threading.Thread(target=self._run, name="fare-history", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Vacía la cola pendiente y detiene el hilo escritor"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def record(self, rows: List[FareRow]):
+        """Encola tarifas observadas ahora; no toca el disco en el camino de la petición
+
+        Las filas con una fecha de vuelo no válida se descartan aquí, una a
+        una, para que no hagan fallar el lote entero en el hilo escritor.
+        """
+        dates: Dict[str, Optional[str]] = {}
+        valid = []
+        for row in rows:
+            fecha = row[2]
+            if fecha not in dates:
+                try:
+                    dates[fecha] = date.fromisoformat(fecha).isoformat()
+                except (TypeError, ValueError):
+                    dates[fecha] = None
+            normalized = dates[fecha]
+            if normalized is None:
+                continue
+            valid.append(row if normalized == fecha else (*row[:2], normalized, *row[3:]))
+        self.rows_rejected += len(rows) - len(valid)
+        if valid:
+            self._queue.put((date.today().isoformat(), valid))
+
+    def _lock(self):
+        # Lock de fichero: varios workers pueden anexar al mismo histórico
+        lock_file = open(os.path.join(self.root, ".lock"), "w")
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _write_batch(self, batch: List[Tuple[str, List[FareRow]]]):
+        by_day: Dict[str, List[FareRow]] = {}
+        for day, rows in batch:
+            by_day.setdefault(day, []).extend(rows)
+
+        with self._lock(), self._mutex:
+            for dictionary in (self._routes, self._airlines, self._sources):
+                dictionary.refresh()
+            for day, rows in by_day.items():
+                origins, destinations, dates, airlines, prices, sources = zip(*rows)
+                columns = {
+                    "fecha": np.array(dates, dtype="datetime64[D]").astype(np.int64),
+                    "precio": np.array(prices, dtype=np.float64),
+                    "ruta": self._routes.intern([f"{o}-{d}" for o, d in zip(origins, destinations)]),
+                    "aerolinea": self._airlines.intern(airlines),
+                    "fuente": self._sources.intern(sources),
+                }
+                partition = os.path.join(self.root, day)
+                if os.path.isdir(partition + SEALED_SUFFIX):
+                    # Filas rezagadas de un día ya cerrado: van a la partición de hoy
+                    partition = os.path.join(self.root, date.today().isoformat())
+                os.makedirs(partition, exist_ok=True)
+                for name, dtype in COLUMNS.items():
+                    with open(_column_path(partition, name), "ab") as f:
+                        columns[name].astype(dtype).tofile(f)
+                self.rows_written += len(rows)
+        self.batches_written += 1
+
+    def _partitions(self) -> List[Tuple[str, str, bool]]:
+        """(día, directorio, cerrada) de todas las particiones, por día"""
+        partitions = {}
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(TMP_SUFFIX) or not os.path.isdir(path):
+                continue
+            sealed = name.endswith(SEALED_SUFFIX)
+            day = name[:-len(SEALED_SUFFIX)] if sealed else name
+            # Si existen las dos, la cerrada es la buena (el cierre se interrumpió al borrar la abierta)
+            if sealed or day not in partitions:
+                partitions[day] = (day, path, sealed)
+        return [partitions[day] for day in sorted(partitions)]
+
+    def _seal(self, day: str, path: str):
+        """Ordena por ruta las filas del día y escribe el índice ruta -> [inicio, fin)"""
+        columns = _read_columns(path, mmap=False)
+        order = np.argsort(columns["ruta"], kind="stable")
+        tmp = os.path.join(self.root, day + TMP_SUFFIX)
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, values in columns.items():
+            values[order].tofile(_column_path(tmp, name))
+        routes, starts = np.unique(columns["ruta"][order], return_index=True)
+        np.save(os.path.join(tmp, "indice_rutas.npy"), routes.astype(np.uint32))
+        np.save(os.path.join(tmp, "indice_inicios.npy"), np.append(starts, len(order)).astype(np.int64))
+        os.rename(tmp, os.path.join(self.root, day + SEALED_SUFFIX))
+        shutil.rmtree(path)
+        self.partitions_sealed += 1
+
+    def _maintain(self):
+        """Cierra las particiones de días pasados y borra las caducadas"""
+        today = date.today().isoformat()
+        cutoff = (date.today() - timedelta(days=self.max_age_days)).isoformat()
+        with self._lock():
+            for name in os.listdir(self.root):
+                if name.endswith(TMP_SUFFIX):
+                    shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            for day, path, sealed in self._partitions():
+                if day < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                elif not sealed and day < today:
+                    self._seal(day, path)
+                elif sealed and os.path.isdir(os.path.join(self.root, day)):
+                    shutil.rmtree(os.path.join(self.root, day), ignore_errors=True)
+
+    def _run(self):
+        maintained_day = None
+        batches = drain_batches(self._queue, self.flush_interval)
+        while True:
+            if maintained_day != date.today():
+                try:
+                    self._maintain()
+                except OSError as e:
+                    print(f"Error al cerrar particiones del histórico: {e}")
+                maintained_day = date.today()
+            batch = next(batches, None)
+            if batch is None:
+                return
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except (OSError, ValueError) as e:
+                    print(f"Error al persistir el histórico de tarifas: {e}")
+
+    def _sealed_partition(self, day: str, path: str):
+        cached = self._sealed.get(day)
+        if cached is None:
+            routes = np.load(os.path.join(path, "indice_rutas.npy"))
+            starts = np.load(os.path.join(path, "indice_inicios.npy"))
+            cached = self._sealed[day] = (routes, starts, _read_columns(path))
+        return cached
+
+    def _route_rows(self, day: str, path: str, sealed: bool, route: int) -> Dict[str, np.ndarray]:
+        """Filas de una ruta en una partición"""
+        if sealed:
+            routes, starts, columns = self._sealed_partition(day, path)
+            i = np.searchsorted(routes, route)
+            if i == len(routes) or routes[i] != route:
+                return {}
+            return {name: values[starts[i]:starts[i + 1]] for name, values in columns.items()}
+        columns = _read_columns(path)
+        mask = columns["ruta"] == route
+        return {name: values[mask] for name, values in columns.items()}
+
+    def trend(self, origen: str, destino: str, desde: Optional[str] = None, hasta: Optional[str] = None,
+              fuente: Optional[str] = None) -> List[dict]:
+        """Mínimo, media y percentiles del precio por día de observación"""
+        with self._mutex:
+            self._routes.refresh()
+            self._sources.refresh()
+            route = self._routes.ids.get(f"{origen}-{destino}")
+            source = self._sources.ids.get(fuente) if fuente else None
+            if route is None or (fuente and source is None):
+                return []
+
+            partitions = self._partitions()
+            present = {day for day, _, sealed in partitions if sealed}
+            for day in list(self._sealed):
+                if day not in present:
+                    del self._sealed[day]
+
+            dias = []
+            for day, path, sealed in partitions:
+                if (desde and day < desde) or (hasta and day > hasta):
+                    continue
+                try:
+                    rows = self._route_rows(day, path, sealed, route)
+                except OSError:
+                    # Otro worker acaba de cerrar la partición
+                    continue
+                if not rows:
+                    continue
+                prices = rows["precio"]
+                if source is not None:
+                    prices = prices[rows["fuente"] == source]
+                if not len(prices):
+                    continue
+                percentiles = np.percentile(prices, PERCENTILES)
+                dias.append({
+                    "dia": day,
+                    "muestras": int(len(prices)),
+                    "precio_min": round(float(prices.min()), 2),
+                    "precio_medio": round(float(prices.mean(dtype=np.float64)), 2),
+                    **{f"p{p}": round(float(value), 2) for p, value in zip(PERCENTILES, percentiles)},
+                })
+            return dias
+
+    def stats(self) -> dict:
+        """Estado del histórico para /api-info"""
+        with self._mutex:
+            self._routes.refresh()
+        return {
+            "path": self.root,
+            "max_age_days": self.max_age_days,
+            "routes": len(self._routes.values),
+            "pending_writes": self._queue.qsize(),
+            "rows_written": self.rows_written,
+            "rows_rejected": self.rows_rejected,
+            "batches_written": self.batches_written,
+            "partitions_sealed": self.partitions_sealed,
+        }
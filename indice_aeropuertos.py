@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Índice de autocompletado de aeropuertos
+Normaliza (minúsculas, sin acentos) el código IATA, nombre, ciudad y país
+de cada aeropuerto y precalcula todos los prefijos de cada palabra, de
+modo que "sao", "São" y "GRU" se resuelven con una búsqueda binaria. Los
+prefijos viven en arrays ordenados con sus aeropuertos en formato CSR y
+el índice se construye en la primera búsqueda, no al crearlo.
+"""
+
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+# Peso de cada campo en el ranking
+FIELD_WEIGHTS = {
+    "iata": 100,
+    "ciudad": 30,
+    "nombre": 20,
+    "pais": 10,
+}
+
+# Bonificación cuando la palabra completa coincide, no solo un prefijo
+EXACT_BONUS = 5
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin acentos y solo caracteres alfanuméricos separados por espacios"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+    return _NON_ALNUM.sub(" ", folded).strip()
+
+
+def _fields(code: str, info: dict) -> Dict[str, str]:
+    return {
+        "iata": code,
+        "ciudad": info.get("ciudad", ""),
+        "nombre": info.get("nombre", ""),
+        "pais": info.get("pais", ""),
+    }
+
+
+class AirportIndex:
+    """Índice de prefijos sobre la tabla de aeropuertos"""
+
+    def __init__(self, airports: Mapping[str, dict], max_prefix: int = 12):
+        self.airports = airports
+        self.max_prefix = max_prefix
+        self.built = False
+        self._lock = threading.Lock()
+
+    def build(self):
+        """Construye el índice si aún no existe (se puede llamar desde un hilo)"""
+        with self._lock:
+            if not self.built:
+                self._build()
+
+    def _build(self):
+        self.codes = list(self.airports)
+        words: List[str] = []
+        owners: List[int] = []
+        weights: List[int] = []
+        for airport_id, code in enumerate(self.codes):
+            for field, value in _fields(code, self.airports[code]).items():
+                for token in normalize(value).split():
+                    words.append(token)
+                    owners.append(airport_id)
+                    weights.append(FIELD_WEIGHTS[field])
+
+        # Un array por longitud de prefijo: truncar bytes de ancho fijo es un astype
+        width = f"S{self.max_prefix}"
+        tokens = np.array(words, dtype=width)
+        lengths = np.fromiter((len(word) for word in words), dtype=np.int32, count=len(words))
+        owner_ids = np.array(owners, dtype=np.int32)
+        weight_values = np.array(weights, dtype=np.int16)
+        prefixes, ids, scores = [np.zeros(0, dtype=width)], [np.zeros(0, dtype=np.int32)], [np.zeros(0, dtype=np.int16)]
+        for length in range(1, self.max_prefix + 1):
+            mask = lengths >= length
+            prefixes.append(tokens[mask].astype(f"S{length}").astype(width))
+            ids.append(owner_ids[mask])
+            scores.append(weight_values[mask] + np.where(lengths[mask] == length, EXACT_BONUS, 0).astype(np.int16))
+        prefixes, ids, scores = np.concatenate(prefixes), np.concatenate(ids), np.concatenate(scores)
+
+        # Una entrada por (prefijo, aeropuerto) con su mejor puntuación
+        order = np.lexsort((-scores, ids, prefixes))
+        prefixes, ids, scores = prefixes[order], ids[order], scores[order]
+        first = np.ones(len(ids), dtype=bool)
+        first[1:] = (prefixes[1:] != prefixes[:-1]) | (ids[1:] != ids[:-1])
+        prefixes, ids, scores = prefixes[first], ids[first], scores[first]
+
+        # Cada lista, por puntuación descendente y después por id
+        order = np.lexsort((ids, -scores, prefixes))
+        prefixes, self._ids, self._scores = prefixes[order], ids[order], scores[order]
+        self._prefixes, starts = np.unique(prefixes, return_index=True)
+        self._indptr = np.append(starts, len(prefixes))
+        self.built = True
+
+    def _posting(self, prefix: str) -> Optional[Tuple[int, int]]:
+        """Rango de la lista de aeropuertos de un prefijo, o None si no existe"""
+        key = prefix.encode("ascii")
+        position = int(np.searchsorted(self._prefixes, key))
+        if position == len(self._prefixes) or self._prefixes[position] != key:
+            return None
+        return int(self._indptr[position]), int(self._indptr[position + 1])
+
+    def _matches(self, airport_id: int, token: str) -> bool:
+        # Solo necesario para palabras más largas que el prefijo indexado
+        code = self.codes[airport_id]
+        words: Set[str] = set()
+        for value in _fields(code, self.airports[code]).values():
+            words.update(normalize(value).split())
+        return any(word.startswith(token) for word in words)
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Devuelve los `limit` aeropuertos mejor puntuados para la consulta"""
+        tokens = normalize(query).split()
+        if not tokens or limit <= 0:
+            return []
+        if not self.built:
+            self.build()
+
+        postings = []
+        for token in tokens:
+            bounds = self._posting(token[:self.max_prefix])
+            if bounds is None:
+                return []
+            postings.append((token, bounds))
+
+        # Recorrer la lista más selectiva y puntuar contra las demás
+        postings.sort(key=lambda item: item[1][1] - item[1][0])
+        start, end = postings[0][1]
+        long_tokens = [token for token in tokens if len(token) > self.max_prefix]
+
+        if len(postings) == 1 and not long_tokens:
+            end = min(end, start + limit)
+            ranked = zip(self._scores[start:end].tolist(), self._ids[start:end].tolist())
+        else:
+            candidates = self._ids[start:end]
+            totals = self._scores[start:end].astype(np.int32)
+            for _, (other_start, other_end) in postings[1:]:
+                order = np.argsort(self._ids[other_start:other_end], kind="stable")
+                other_ids = self._ids[other_start:other_end][order]
+                other_scores = self._scores[other_start:other_end][order]
+                positions = np.minimum(np.searchsorted(other_ids, candidates), len(other_ids) - 1)
+                found = other_ids[positions] == candidates
+                candidates, totals = candidates[found], totals[found] + other_scores[positions[found]]
+            if long_tokens:
+                keep = [all(self._matches(airport_id, token) for token in long_tokens)
+                        for airport_id in candidates.tolist()]
+                candidates, totals = candidates[keep], totals[keep]
+            top = np.lexsort((candidates, -totals))[:limit]
+            ranked = zip(totals[top].tolist(), candidates[top].tolist())
+
+        return [
+            {"codigo": self.codes[airport_id], "score": score, **self.airports[self.codes[airport_id]]}
+            for score, airport_id in ranked
+        ]
+
+    def stats(self) -> dict:
+        """Tamaño del índice para /api-info (cero mientras no se haya construido)"""
+        return {
+            "built": self.built,
+            "prefixes": len(self._prefixes) if self.built else 0,
+            "postings": len(self._ids) if self.built else 0,
+        }
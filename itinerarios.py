@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Red de rutas y búsqueda de itinerarios con escalas
+Grafo sobre los aeropuertos de aeropuertos_data: conexiones regionales
+por distancia, alimentación hacia los hubs y red troncal entre hubs.
+Las aristas pesan el tiempo de bloque de distancias.duration_ids y cada
+escala añade un tiempo mínimo de conexión. Las escalas solo se hacen en
+hubs, así que la búsqueda recorre unas decenas de nodos y no la tabla
+entera, aunque esta tenga decenas de miles de aeropuertos.
+"""
+
+import heapq
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from aeropuertos_data import AEROPUERTOS_MUNDIALES
+from distancias import closeness_ids, closeness_threshold, distance_ids, duration_ids, spatial_grid
+
+# Hubs de conexión principales
+HUBS = [
+    "MAD", "LHR", "CDG", "FRA", "AMS", "IST", "MUC",
+    "JFK", "ATL", "ORD", "DFW", "LAX", "MIA", "YYZ", "MEX",
+    "GRU", "BOG", "SCL", "LIM",
+    "DXB", "DOH", "SIN", "HKG", "ICN", "NRT", "PEK", "BKK", "DEL",
+    "JNB", "ADD", "CAI", "NBO",
+    "SYD", "AKL",
+]
+
+REGIONAL_RANGE_KM = 1500    # vuelos punto a punto entre aeropuertos cercanos
+HUB_FEEDER_RANGE_KM = 4000  # vuelos entre un aeropuerto y un hub
+HUB_RANGE_KM = 16000        # vuelos de largo radio entre hubs
+MIN_CONNECTION_MIN = 60     # tiempo mínimo de conexión en cada escala
+MAX_DETOUR = 2.0            # poda de itinerarios mucho más largos que el directo
+REGIONAL_MAX_NEIGHBOURS = 25  # tope de vuelos regionales por aeropuerto en zonas densas
+
+Path = Tuple[int, ...]
+
+
+class RouteNetwork:
+    """Grafo de rutas en formato CSR: aristas agrupadas por origen y ordenadas por duración"""
+
+    def __init__(self):
+        n = len(AEROPUERTOS_MUNDIALES)
+        is_hub = np.zeros(n, dtype=bool)
+        for code in HUBS:
+            if code in AEROPUERTOS_MUNDIALES:
+                is_hub[AEROPUERTOS_MUNDIALES.id(code)] = True
+        hub_ids = np.flatnonzero(is_hub)
+        sources, targets = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+
+        # Vuelos regionales: cada celda de la rejilla solo se compara con sus vecinas
+        regional_min = closeness_threshold(REGIONAL_RANGE_KM)
+        grid = spatial_grid()
+        for cell in grid.occupied_cells():
+            rows = grid.cell_ids(cell)
+            candidates = grid.candidates(cell, REGIONAL_RANGE_KM)
+            closeness = closeness_ids(rows, candidates)
+            closeness[rows[:, None] == candidates[None, :]] = -np.inf
+            regional = closeness >= regional_min
+            if len(candidates) > REGIONAL_MAX_NEIGHBOURS:
+                cutoff = -np.partition(-closeness, REGIONAL_MAX_NEIGHBOURS - 1, axis=1)[:, REGIONAL_MAX_NEIGHBOURS - 1]
+                regional &= closeness >= cutoff[:, None]
+            r, c = np.nonzero(regional)
+            sources.append(rows[r])
+            targets.append(candidates[c])
+
+        # Alimentación hacia los hubs, red troncal y hub más cercano de cada aeropuerto
+        if len(hub_ids):
+            to_hubs = distance_ids(np.arange(n)[:, None], hub_ids[None, :])
+            to_hubs[hub_ids, np.arange(len(hub_ids))] = np.inf
+            links = to_hubs <= HUB_FEEDER_RANGE_KM
+            links[hub_ids] |= to_hubs[hub_ids] <= HUB_RANGE_KM
+            links[np.arange(n), np.argmin(to_hubs, axis=1)] = True
+            r, c = np.nonzero(links)
+            sources.append(r)
+            targets.append(hub_ids[c])
+
+        # Grafo no dirigido: cada arista en los dos sentidos, sin duplicados
+        sources, targets = np.concatenate(sources), np.concatenate(targets)
+        keys = np.sort(np.concatenate([sources * n + targets, targets * n + sources]))
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+        sources, targets = keys // n, keys % n
+        minutes = duration_ids(sources, targets)
+        order = np.lexsort((targets, minutes, sources))
+
+        self.num_airports = n
+        self.is_hub = is_hub
+        self.hub_ids = hub_ids
+        self.edge_keys = keys
+        self.indptr = np.searchsorted(sources[order], np.arange(n + 1))
+        self.targets = targets[order].astype(np.int32)
+        self.minutes = minutes[order]
+        self._hub_neighbours: Dict[int, List[Tuple[int, int]]] = {}
+
+    def hub_neighbours(self, node: int) -> List[Tuple[int, int]]:
+        """(hub, minutos) de los vuelos directos desde `node` a un hub, de más corto a más largo"""
+        adjacent = self._hub_neighbours.get(node)
+        if adjacent is None:
+            start, end = self.indptr[node], self.indptr[node + 1]
+            targets, minutes = self.targets[start:end], self.minutes[start:end]
+            hubs = self.is_hub[targets]
+            adjacent = self._hub_neighbours[node] = list(zip(targets[hubs].tolist(), minutes[hubs].tolist()))
+        return adjacent
+
+    def has_direct(self, origin: int, destination: int) -> bool:
+        """True si existe vuelo directo entre los dos aeropuertos"""
+        key = origin * self.num_airports + destination
+        position = np.searchsorted(self.edge_keys, key)
+        return bool(position < len(self.edge_keys) and self.edge_keys[position] == key)
+
+    def k_shortest(self, origin: int, destination: int, k: int = 5, max_stops: int = 2) -> List[Tuple[int, Path]]:
+        """Los k itinerarios sin ciclos más rápidos con como mucho `max_stops` escalas en hubs
+
+        Búsqueda best-first (Dijkstra/A*) sobre caminos parciales: la duración
+        del vuelo directo hasta el destino es una cota inferior admisible, así
+        que los caminos completos salen del heap ordenados por duración. Desde
+        cada nodo solo se expanden los hubs y, si existe, el vuelo directo al
+        destino, de modo que el coste no depende del tamaño de la tabla.
+        """
+        if origin == destination:
+            return []
+
+        # Cota inferior solo para los nodos que pueden aparecer en un camino
+        lower_bound = dict(zip(self.hub_ids.tolist(), duration_ids(self.hub_ids, destination).tolist()))
+        lower_bound[origin] = int(duration_ids(origin, destination))
+        limit = lower_bound[origin] * MAX_DETOUR + MIN_CONNECTION_MIN * max_stops
+        heap = [(lower_bound[origin], 0, (origin,))]
+        results = []
+
+        while heap and len(results) < k:
+            _, cost, path = heapq.heappop(heap)
+            node = path[-1]
+            if node == destination:
+                results.append((cost, path))
+                continue
+
+            legs = len(path) - 1
+            connection = MIN_CONNECTION_MIN if legs else 0
+            if self.has_direct(node, destination):
+                new_cost = cost + int(duration_ids(node, destination)) + connection
+                if new_cost <= limit:
+                    heapq.heappush(heap, (new_cost, new_cost, path + (destination,)))
+            if legs == max_stops:
+                continue
+
+            for neighbour, minutes in self.hub_neighbours(node):
+                if neighbour in path or neighbour == destination:
+                    continue
+                new_cost = cost + minutes + connection
+                estimate = new_cost + lower_bound[neighbour] + MIN_CONNECTION_MIN
+                if estimate > limit:
+                    continue
+                heapq.heappush(heap, (estimate, new_cost, path + (neighbour,)))
+
+        return results
+
+
+@lru_cache(maxsize=None)
+def route_network() -> RouteNetwork:
+    """Red de toda la tabla, construida la primera vez que se pide"""
+    return RouteNetwork()
+
+
+@lru_cache(maxsize=4096)
+def _cached_paths(origin: int, destination: int, k: int, max_stops: int) -> Tuple[Tuple[int, Path], ...]:
+    return tuple(route_network().k_shortest(origin, destination, k, max_stops))
+
+
+def find_itineraries(dep_iata: str, arr_iata: str, k: int = 5, max_stops: int = 2) -> List[dict]:
+    """Itinerarios ordenados por duración total, con el detalle de cada tramo"""
+    origin, destination = AEROPUERTOS_MUNDIALES.id(dep_iata), AEROPUERTOS_MUNDIALES.id(arr_iata)
+    if origin is None or destination is None:
+        return []
+
+    codes = AEROPUERTOS_MUNDIALES.codes
+    itineraries = []
+    for cost, path in _cached_paths(origin, destination, k, max_stops):
+        tramos = []
+        for leg, (i, j) in enumerate(zip(path, path[1:])):
+            tramos.append({
+                "origen": codes[i],
+                "destino": codes[j],
+                "distancia_km": int(round(float(distance_ids(i, j)))),
+                "duracion_min": int(duration_ids(i, j)),
+                "conexion_min": MIN_CONNECTION_MIN if leg else 0,
+            })
+        itineraries.append({
+            "escalas": len(tramos) - 1,
+            "duracion_total_min": cost,
+            "distancia_km": sum(t["distancia_km"] for t in tramos),
+            "tramos": tramos,
+        })
+    return itineraries
+
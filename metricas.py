@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Métricas en formato de exposición de Prometheus
+Contadores e histogramas en memoria del propio worker: todo se registra
+desde el hilo del event loop, así que no hace falta ningún lock. Cada
+worker publica sus series con la etiqueta `worker` (su pid), que se lee
+al publicar y no al importar: con un servidor pre-fork (gunicorn
+--preload) el módulo se importa en el maestro antes de crear los workers.
+"""
+
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _worker() -> str:
+    return str(os.getpid())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = ("worker", *labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        worker = _worker()
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.label_names, (worker, *key))} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    """Valor instantáneo calculado en el momento del scrape"""
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def collect(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} gauge",
+            f'{self.name}{{worker="{_worker()}"}} {_number(self.callback())}',
+        ]
+
+
+class Histogram:
+    """Histograma de buckets fijos con etiquetas"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = ("worker", *labels)
+        self.buckets = tuple(buckets)
+        # por serie: [conteo por bucket..., +Inf, suma]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        worker = _worker()
+        for key, series in self._series.items():
+            key = (worker, *key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                labels = _labels((*self.label_names, "le"), (*key, le))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas publicadas en /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta",
+    labels=("method", "route", "status")
+))
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    "aviationstack_request_duration_seconds", "Latencia de las llamadas a AviationStack"
+))
+UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    "aviationstack_requests_total", "Llamadas a AviationStack por resultado", labels=("status",)
+))
+QUOTA_CONSUMED = REGISTRY.register(Counter(
+    "aviationstack_quota_consumed_total", "Peticiones de cuota consumidas por este worker"
+))
+FLIGHTS_GENERATED = REGISTRY.register(Counter(
+    "flights_generated_total", "Vuelos devueltos por tipo de origen", labels=("tipo",)
+))
+BUDGET_EXCEEDED = REGISTRY.register(Counter(
+    "real_data_budget_exceeded_total", "Búsquedas servidas con simulados por superar el presupuesto de latencia"
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "admission_rejected_total", "Peticiones rechazadas por el control de admisión", labels=("reason",)
+))
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    "admission_queue_wait_seconds", "Espera en la cola de admisión de las peticiones admitidas", buckets=LAG_BUCKETS
+))
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    "event_loop_lag_seconds", "Retraso del event loop respecto al intervalo previsto", buckets=LAG_BUCKETS
+))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide la latencia de cada petición por ruta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "sin_ruta")
+            HTTP_LATENCY.observe(time.perf_counter() - started, scope["method"], path, str(status))
+
+
+async def monitor_event_loop(interval: float = 0.5):
+    """Mide cuánto tarda el loop en despertar respecto a lo previsto"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
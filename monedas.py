@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Conversión de precios a otras monedas
+Los precios se calculan en USD. La tabla de tipos de cambio se carga de un
+fichero local o de un proveedor intercambiable y se guarda como una
+instantánea inmutable que se sustituye de golpe al refrescarla; el refresco
+ocurre en segundo plano cuando la instantánea caduca, así que ninguna
+petición espera por él. La conversión se aplica con numpy sobre todos los
+precios de una respuesta a la vez.
+"""
+
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+import numpy as np
+
+BASE_CURRENCY = "USD"
+
+# Tabla mínima si no se puede cargar ninguna: la aproximación a EUR de siempre
+FALLBACK_TABLE = {"base": BASE_CURRENCY, "tipos": {"USD": 1.0, "EUR": 0.85}}
+
+DEFAULT_DECIMALS = 2
+
+# Proveedor de tablas: devuelve {"base": "USD", "tipos": {...}, "decimales": {...}}
+RateProvider = Callable[[], Awaitable[dict]]
+
+
+class RateSnapshot:
+    """Tipos de cambio respecto a USD en un momento dado (no se modifica tras crearse)"""
+
+    def __init__(self, table: dict, source: str):
+        if table.get("base", BASE_CURRENCY) != BASE_CURRENCY:
+            raise ValueError(f"La tabla de tipos debe tener base {BASE_CURRENCY}")
+        rates = {code.upper(): float(rate) for code, rate in table["tipos"].items()}
+        rates[BASE_CURRENCY] = 1.0
+        if any(not rate > 0 for rate in rates.values()):
+            raise ValueError("Los tipos de cambio deben ser positivos")
+        self.rates: Dict[str, float] = rates
+        self.decimals: Dict[str, int] = {code.upper(): int(d) for code, d in table.get("decimales", {}).items()}
+        self.date: Optional[str] = table.get("fecha")
+        self.source = source
+        self.loaded_at = time.time()
+
+    def supports(self, currency: str) -> bool:
+        return currency in self.rates
+
+    def convert(self, usd: np.ndarray, currency: str) -> np.ndarray:
+        """Importes en USD convertidos y redondeados a los decimales de `currency`"""
+        return np.round(np.asarray(usd, dtype=np.float64) * self.rates[currency],
+                        self.decimals.get(currency, DEFAULT_DECIMALS))
+
+
+def file_provider(path: str) -> RateProvider:
+    """Proveedor que lee la tabla de un fichero JSON local"""
+    def read() -> dict:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    async def load() -> dict:
+        return await asyncio.to_thread(read)
+    return load
+
+
+def url_provider(url: str, timeout: float = 5) -> RateProvider:
+    """Proveedor que descarga la tabla (mismo formato JSON) de una URL"""
+    async def load() -> dict:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.json()
+    return load
+
+
+class CurrencyEngine:
+    """Instantánea de tipos con TTL y refresco en segundo plano"""
+
+    def __init__(self, provider: RateProvider, source: str, ttl: float = 3600, retry_interval: float = 60):
+        self.provider = provider
+        self.source = source
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._snapshot = RateSnapshot(FALLBACK_TABLE, "fallback")
+        self._next_refresh = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.failures = 0
+
+    async def refresh(self) -> bool:
+        """Carga la tabla y sustituye la instantánea; si falla se conserva la anterior"""
+        try:
+            snapshot = RateSnapshot(await self.provider(), self.source)
+        except Exception as e:
+            print(f"Error al cargar los tipos de cambio de {self.source}: {e}")
+            self.failures += 1
+            self._next_refresh = time.monotonic() + self.retry_interval
+            return False
+        self._snapshot = snapshot
+        self._next_refresh = time.monotonic() + self.ttl
+        self.refreshes += 1
+        return True
+
+    def snapshot(self) -> RateSnapshot:
+        """Instantánea vigente; si ha caducado lanza un refresco sin esperarlo"""
+        if time.monotonic() >= self._next_refresh and (self._refreshing is None or self._refreshing.done()):
+            self._next_refresh = time.monotonic() + self.retry_interval
+            self._refreshing = asyncio.get_running_loop().create_task(self.refresh())
+        return self._snapshot
+
+    async def close(self):
+        if self._refreshing is not None:
+            self._refreshing.cancel()
+            await asyncio.gather(self._refreshing, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Estado para /api-info"""
+        snapshot = self._snapshot
+        return {
+            "source": snapshot.source,
+            "rates_date": snapshot.date,
+            "currencies": sorted(snapshot.rates),
+            "age_seconds": round(time.time() - snapshot.loaded_at, 1),
+            "ttl_seconds": self.ttl,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Panel de salidas de un aeropuerto
+En lugar de pedir a AviationStack cada par origen-destino, se descarga de
+una vez el panel de salidas del día de un origen (paginando con `offset`)
+y se indexa por IATA de llegada. Cualquier búsqueda posterior desde ese
+origen es una consulta a un dict, y la cuota pasa a depender del número
+de orígenes y no del de rutas.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Clave de destino con la que el panel completo se guarda en el almacén
+BOARD_DESTINATION = "*"
+
+# Una página del upstream: (offset, limit) -> respuesta JSON o None si falló
+PageFetcher = Callable[[int, int], Awaitable[Optional[dict]]]
+
+
+def index_board(flights: List[dict]) -> Dict[str, List[dict]]:
+    """Agrupa los vuelos del panel por IATA de llegada conservando su orden"""
+    index: Dict[str, List[dict]] = {}
+    for flight in flights:
+        arr_iata = (flight.get('arrival') or {}).get('iata')
+        if arr_iata:
+            index.setdefault(arr_iata, []).append(flight)
+    return index
+
+
+async def fetch_board(fetch_page: PageFetcher, page_size: int, max_pages: int) -> Optional[List[dict]]:
+    """Descarga todas las páginas del panel
+
+    La primera página da el total; el resto se piden a la vez. Devuelve None
+    si falla la primera página; si falla alguna posterior se devuelve lo
+    obtenido, porque cada vuelo del panel es válido por sí mismo.
+    """
+    first = await fetch_page(0, page_size)
+    if first is None:
+        return None
+    flights = list(first.get('data') or [])
+
+    pagination = first.get('pagination') or {}
+    total = int(pagination.get('total') or len(flights))
+    # El upstream puede servir menos de `page_size` por página: se avanza lo que sirvió
+    step = len(flights)
+    offsets = range(step, min(total, step * max_pages), step) if step else []
+    pages = await asyncio.gather(*(fetch_page(offset, step) for offset in offsets))
+
+    for page in pages:
+        if page is not None:
+            flights.extend(page.get('data') or [])
+    return flights
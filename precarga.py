@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Precarga en segundo plano de las rutas más buscadas
+Cuenta la popularidad de cada ruta a partir de las búsquedas entrantes y,
+al arrancar y después periódicamente, descarga los datos de hoy de las
+N rutas más populares. La cuota mensual restante (menos una reserva para
+las búsquedas bajo demanda) se reparte entre los días que quedan de mes.
+En modo multi-worker las búsquedas se anotan en el almacén compartido y
+el worker que precarga lee de ahí la popularidad de todos los procesos.
+"""
+
+import asyncio
+import calendar
+from collections import Counter
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Tuple
+
+
+class Prefetcher:
+    """Planificador de precarga de rutas populares dentro del presupuesto de cuota"""
+
+    def __init__(self, fetch_route: Callable[[str, str, str], Awaitable[object]],
+                 is_fresh: Callable[[Tuple[str, str, str]], bool],
+                 quota: Callable[[], Tuple[int, int]],
+                 top_n: int = 10, reserve: int = 20, interval: float = 3600):
+        self.fetch_route = fetch_route
+        self.is_fresh = is_fresh
+        self.quota = quota
+        self.top_n = top_n
+        self.reserve = reserve
+        self.interval = interval
+        self.popularity: Counter = Counter()
+        # Almacén compartido (modo multi-worker): si está, la popularidad vive allí
+        self.store = None
+        self.day: Optional[str] = None
+        self.spent_today = 0
+        self.prefetched = 0
+        self.last_run: Optional[str] = None
+
+    def record(self, origen: str, destino: str):
+        """Anota una búsqueda de la ruta"""
+        if self.store is not None:
+            self.store.put_search(origen, destino, datetime.now().strftime('%Y-%m-%d'))
+        else:
+            self.popularity[(origen, destino)] += 1
+
+    def daily_budget(self, now: Optional[datetime] = None) -> int:
+        """Llamadas que la precarga puede gastar hoy"""
+        now = now or datetime.now()
+        used, limit = self.quota()
+        days_left = calendar.monthrange(now.year, now.month)[1] - now.day + 1
+        available = limit - used - self.reserve
+        if available <= 0:
+            return 0
+        return available // days_left + self.spent_today
+
+    def _start_day(self, today: str):
+        # Cada nuevo día la popularidad acumulada pierde la mitad de su peso
+        self.day = today
+        self.spent_today = 0
+        self.popularity = Counter({
+            route: count // 2 for route, count in self.popularity.items() if count // 2 > 0
+        })
+
+    async def run_once(self) -> int:
+        """Una pasada de precarga; devuelve las rutas descargadas"""
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
+        if today != self.day:
+            self._start_day(today)
+        if self.store is not None:
+            # El almacén ya aplica el decaimiento diario por la fecha de cada búsqueda
+            self.popularity = Counter(await asyncio.to_thread(self.store.load_popularity, today))
+        self.last_run = now.isoformat()
+
+        fetched = 0
+        for (origen, destino), _ in self.popularity.most_common(self.top_n):
+            key = (origen, destino, today)
+            if self.is_fresh(key):
+                continue
+            if self.spent_today >= self.daily_budget(now):
+                break
+            self.spent_today += 1
+            await self.fetch_route(origen, destino, today)
+            fetched += 1
+
+        self.prefetched += fetched
+        return fetched
+
+    async def run(self):
+        """Bucle de fondo: una pasada al arrancar y otra cada `interval` segundos"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Error en la precarga de rutas: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        """Estado para /api-info"""
+        return {
+            "top_n": self.top_n,
+            "reserve": self.reserve,
+            "interval_seconds": self.interval,
+            "tracked_routes": len(self.popularity),
+            "spent_today": self.spent_today,
+            "daily_budget": self.daily_budget(),
+            "prefetched_total": self.prefetched,
+            "last_run": self.last_run,
+            "top_routes": [f"{o}-{d}" for (o, d), _ in self.popularity.most_common(5)],
+        }
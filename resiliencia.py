@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker para las llamadas a AviationStack
+Se abre tras N fallos o llamadas lentas consecutivas; pasado el tiempo de
+enfriamiento deja pasar una única llamada de prueba (half-open) y según
+su resultado vuelve a cerrarse o se abre de nuevo.
+
+Cada cambio de estado abre una generación nueva y el permiso que da
+allow() es la generación en la que empezó la llamada: un resultado que
+llega tarde de una generación anterior (p. ej. un éxito lento iniciado
+antes de abrirse el circuito) se descarta en vez de cerrarlo sin prueba.
+La prueba half-open es la primera llamada real tras el enfriamiento; si
+la hace una búsqueda de usuario, esta solo espera su presupuesto de
+latencia y la descarga termina en segundo plano.
+"""
+
+import time
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker por endpoint del upstream"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, slow_call_seconds: float = 2.0,
+                 open_seconds: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.generation = 0
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+        self.stale_results = 0
+
+    def _set_state(self, state: str):
+        self.state = state
+        self.generation += 1
+        self.probe_in_flight = False
+
+    def allow(self) -> Optional[int]:
+        """Permiso para llamar al upstream (la generación actual), o None si se rechaza"""
+        if self.state == CLOSED:
+            return self.generation
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return self.generation
+        self.rejected += 1
+        return None
+
+    def release(self, permit: int):
+        """Devuelve un permiso concedido que finalmente no se usó"""
+        if permit == self.generation and self.state == HALF_OPEN:
+            self.probe_in_flight = False
+
+    def record(self, permit: int, ok: bool, duration: float):
+        """Registra el resultado de una llamada; las lentas cuentan como fallo"""
+        if permit != self.generation:
+            self.stale_results += 1
+            return
+        if ok and duration <= self.slow_call_seconds:
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+            self.consecutive_failures = 0
+            return
+
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.times_opened += 1
+            self._set_state(OPEN)
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """Estado para /api-info"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "stale_results": self.stale_results,
+        }
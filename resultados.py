@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Filtrado, ordenación y paginación de resultados de búsqueda
+El conjunto completo de vuelos de una búsqueda se guarda tal cual; cada
+página se obtiene recorriéndolo de forma perezosa (filtros y cursor en un
+generador) y eligiendo los k primeros con un heap, sin ordenar todo. El
+cursor es opaco y de tipo keyset: codifica la clave de ordenación del
+último vuelo servido, así que las páginas siguientes no dependen de
+desplazamientos ni de que el conjunto siga idéntico.
+"""
+
+import base64
+import heapq
+import json
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+_DURATION = re.compile(r"^\s*(\d+)h\s*(\d+)m\s*$")
+
+# Vuelos sin hora o duración conocida van al final
+UNKNOWN_MINUTES = 10 ** 6
+
+
+def duration_minutes(duracion: str) -> int:
+    """Minutos de una duración '2h 15m'"""
+    match = _DURATION.match(duracion or "")
+    return int(match.group(1)) * 60 + int(match.group(2)) if match else UNKNOWN_MINUTES
+
+
+def clock_minutes(hora: Optional[str]) -> int:
+    """Minutos desde medianoche de 'HH:MM'; ValueError si no es una hora válida"""
+    if not hora:
+        return UNKNOWN_MINUTES
+    hours, _, minutes = hora.partition(":")
+    value = int(hours) * 60 + int(minutes)
+    if not (0 <= int(hours) < 24 and 0 <= int(minutes) < 60):
+        raise ValueError(f"Hora no válida: {hora}")
+    return value
+
+
+# Claves de ordenación disponibles (siempre ascendentes y numéricas)
+SORT_KEYS: Dict[str, Callable[[object], object]] = {
+    "precio": lambda flight: flight.precio,
+    "duracion": lambda flight: duration_minutes(flight.duracion),
+    "salida": lambda flight: clock_minutes(flight.hora_salida),
+    "escalas": lambda flight: flight.escalas,
+}
+
+
+class ResultFilter(NamedTuple):
+    """Filtros de servidor; None significa sin filtro"""
+    precio_max: Optional[float] = None      # en la moneda de la respuesta
+    aerolineas: Optional[Tuple[str, ...]] = None  # nombres en minúsculas o códigos IATA
+    escalas_max: Optional[int] = None
+    salida_desde: Optional[int] = None      # minutos desde medianoche
+    salida_hasta: Optional[int] = None
+    duracion_max: Optional[int] = None      # minutos
+    # Conversión del precio en USD a la moneda de la respuesta (tipo y decimales)
+    price_rate: float = 1.0
+    price_decimals: int = 2
+
+    def matches(self, flight) -> bool:
+        if self.precio_max is not None:
+            precio = flight.precio if self.price_rate == 1.0 else round(flight.precio * self.price_rate, self.price_decimals)
+            if precio > self.precio_max:
+                return False
+        if self.escalas_max is not None and flight.escalas > self.escalas_max:
+            return False
+        if self.aerolineas is not None and flight.aerolinea.lower() not in self.aerolineas \
+                and flight.numero_vuelo[:2].upper() not in self.aerolineas:
+            return False
+        if self.salida_desde is not None or self.salida_hasta is not None:
+            departure = clock_minutes(flight.hora_salida)
+            if departure == UNKNOWN_MINUTES:
+                return False
+            if self.salida_desde is not None and departure < self.salida_desde:
+                return False
+            if self.salida_hasta is not None and departure > self.salida_hasta:
+                return False
+        if self.duracion_max is not None and duration_minutes(flight.duracion) > self.duracion_max:
+            return False
+        return True
+
+
+def parse_airlines(aerolineas: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """'Iberia,VY' -> ('VY', 'iberia'): nombres en minúsculas y códigos de 2 letras en mayúsculas"""
+    if not aerolineas:
+        return None
+    values = set()
+    for value in aerolineas.split(","):
+        value = value.strip()
+        if value:
+            values.add(value.upper() if len(value) == 2 else value.lower())
+    return tuple(sorted(values)) or None
+
+
+def encode_cursor(fingerprint: int, sort: str, key: Tuple[object, int]) -> str:
+    """Cursor opaco tras el vuelo con clave `key` = (valor, posición)"""
+    raw = json.dumps([fingerprint, sort, key[0], key[1]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, fingerprint: int, sort: str) -> Tuple[object, int]:
+    """Clave codificada en el cursor; ValueError si no es de esta búsqueda y orden"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_fingerprint, cursor_sort, value, position = json.loads(raw)
+        if not isinstance(value, (int, float)) or not isinstance(position, int):
+            raise TypeError
+    except (ValueError, TypeError):
+        raise ValueError("Cursor no válido")
+    if cursor_fingerprint != fingerprint or cursor_sort != sort:
+        raise ValueError("El cursor no corresponde a esta búsqueda, filtros u orden")
+    return value, position
+
+
+class Page(NamedTuple):
+    flights: List[object]
+    matching: int
+    next_key: Optional[Tuple[object, int]]
+
+
+def select_page(flights: Sequence[object], result_filter: ResultFilter, sort: str, limit: int,
+                after: Optional[Tuple[object, int]] = None) -> Page:
+    """Los `limit` primeros vuelos que cumplen los filtros después de `after`, con heap"""
+    sort_key = SORT_KEYS[sort]
+    matching = 0
+
+    def candidates():
+        nonlocal matching
+        for position, flight in enumerate(flights):
+            if not result_filter.matches(flight):
+                continue
+            matching += 1
+            key = (sort_key(flight), position)
+            if after is None or key > after:
+                yield key, flight
+
+    # Uno de más para saber si hay página siguiente
+    top = heapq.nsmallest(limit + 1, candidates(), key=lambda item: item[0])
+    page = top[:limit]
+    next_key = page[-1][0] if len(top) > limit else None
+    return Page([flight for _, flight in page], matching, next_key)
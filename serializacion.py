@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Ruta rápida de serialización de respuestas
+Los vuelos que genera la propia API ya son válidos, así que con la ruta
+rápida se construyen como registros con __slots__ (sin validación de
+Pydantic) y la respuesta se codifica directamente a bytes con orjson.
+Los modelos Pydantic siguen describiendo el esquema OpenAPI y validando
+las peticiones de entrada.
+"""
+
+import json
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional, Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la biblioteca estándar
+    orjson = None
+
+
+@dataclass(slots=True, kw_only=True)
+class FlightRecord:
+    """Vuelo sin validar con los mismos campos (y en el mismo orden) que el modelo Flight"""
+    origen: str
+    destino: str
+    fecha: str
+    precio: float
+    moneda: str = "USD"
+    precio_eur: Optional[float] = None
+    aerolinea: str
+    numero_vuelo: str
+    duracion: str
+    hora_salida: Optional[str] = None
+    escalas: int
+    estado: str = "programado"
+    link_compra: str = ""
+    tipo_busqueda: str = "real"
+    tramos: List[dict] = field(default_factory=list)
+
+
+def _default(value):
+    # Solo lo usa json estándar: orjson ya serializa dataclasses y modelos no llegan aquí
+    if isinstance(value, FlightRecord):
+        return {name: getattr(value, name) for name in FlightRecord.__slots__}
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(payload) -> bytes:
+    """JSON compacto en UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def _model_defaults(model: Type[BaseModel]) -> dict:
+    return {
+        name: info.get_default(call_default_factory=True)
+        for name, info in model.model_fields.items()
+    }
+
+
+def model_dict(model: Type[BaseModel], **fields) -> dict:
+    """Campos de `model` con sus valores por defecto, sin validar y en el orden del esquema"""
+    return {**_model_defaults(model), **fields}
+
+
+def json_response(payload, status_code: int = 200) -> Response:
+    """Respuesta con el cuerpo ya codificado"""
+    return Response(dumps(payload), status_code=status_code, media_type="application/json")
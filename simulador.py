@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Simulador determinista de tarifas
+Cada ruta recibe una semilla derivada de (origen, destino, fecha, franja)
+y todos los valores aleatorios salen de un hash contador (splitmix64)
+sobre esa semilla, de modo que búsquedas idénticas devuelven las mismas
+tarifas y un lote de N rutas se genera en una sola llamada vectorizada.
+"""
+
+import hashlib
+import time
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Flujos independientes de números aleatorios por vuelo
+STREAM_AIRLINE = 0
+STREAM_NUMBER = 1
+STREAM_PRICE = 2
+STREAM_SITE = 3
+STREAM_ITINERARY = 4
+STREAM_OPTION = 5
+STREAM_DEPARTURE = 6
+NUM_STREAMS = 8
+
+# Horas de salida simuladas: de 06:00 a 22:55 en pasos de 5 minutos
+FIRST_DEPARTURE_MIN = 6 * 60
+DEPARTURE_SLOTS = 204
+DEPARTURE_STEP_MIN = 5
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    # El desbordamiento módulo 2**64 es parte del algoritmo
+    with np.errstate(over="ignore"):
+        x = x + _GOLDEN
+        x = (x ^ (x >> np.uint64(30))) * _MIX1
+        x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def uniform(seeds: np.ndarray, index: np.ndarray, stream: int) -> np.ndarray:
+    """Uniformes en [0, 1) para cada (semilla, índice) del flujo dado"""
+    counter = np.asarray(index, dtype=np.uint64) * np.uint64(NUM_STREAMS) + np.uint64(stream)
+    bits = _splitmix64(np.asarray(seeds, dtype=np.uint64) ^ _splitmix64(counter))
+    return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def hash_key(*parts) -> int:
+    """Entero de 64 bits estable a partir de una clave"""
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class SimulatedFlights(NamedTuple):
+    """Vuelos simulados de un lote en columnas"""
+    route: np.ndarray       # índice de la ruta en el lote
+    airline: np.ndarray     # índice de la aerolínea
+    number: np.ndarray      # número de vuelo (100-999)
+    price: np.ndarray       # precio USD redondeado
+    site: np.ndarray        # índice del sitio de compra
+    itinerary: np.ndarray   # uniforme para elegir directo / con escalas
+    option: np.ndarray      # uniforme para elegir entre itinerarios con escalas
+    departure: np.ndarray   # hora de salida en minutos desde medianoche
+
+
+class FareSimulator:
+    """Motor de simulación de tarifas con semilla por ruta y franja"""
+
+    def __init__(self, airline_names: Sequence[str], airline_multipliers: np.ndarray,
+                 num_sites: int, salt: int = 0, bucket_hours: float = 24):
+        self.airline_names = list(airline_names)
+        self._airline_index = {name: i for i, name in enumerate(self.airline_names)}
+        self.airline_multipliers = np.asarray(airline_multipliers, dtype=np.float64)
+        self.num_sites = num_sites
+        self.salt = salt
+        self.bucket_hours = bucket_hours
+
+    def bucket(self, now: Optional[float] = None) -> int:
+        """Franja temporal actual: las tarifas cambian de una franja a otra"""
+        now = time.time() if now is None else now
+        return int(now // (self.bucket_hours * 3600))
+
+    def route_seed(self, origen: str, destino: str, fecha: str, bucket: Optional[int] = None) -> int:
+        """Semilla de una ruta"""
+        return hash_key(self.salt, origen, destino, fecha, self.bucket() if bucket is None else bucket)
+
+    def route_seeds(self, routes: Sequence[Tuple[str, str, str]], bucket: Optional[int] = None) -> np.ndarray:
+        """Semillas de varias rutas (origen, destino, fecha)"""
+        bucket = self.bucket() if bucket is None else bucket
+        return np.array([hash_key(self.salt, o, d, f, bucket) for o, d, f in routes], dtype=np.uint64)
+
+    def airline_key(self, airline_name: str) -> int:
+        """Índice de aerolínea conocido o un hash estable para las desconocidas"""
+        index = self._airline_index.get(airline_name)
+        if index is None:
+            index = len(self.airline_names) + hash_key(airline_name) % (1 << 32)
+        return index
+
+    def variation(self, seeds: np.ndarray, airline_keys: np.ndarray) -> np.ndarray:
+        """Variación de precio ±20% por (ruta, aerolínea)"""
+        return 0.8 + 0.4 * uniform(seeds, airline_keys, STREAM_PRICE)
+
+    def simulate(self, seeds: np.ndarray, counts: Sequence[int], base_prices: np.ndarray) -> SimulatedFlights:
+        """Genera counts[r] vuelos para cada ruta r del lote en una sola pasada"""
+        seeds = np.asarray(seeds, dtype=np.uint64)
+        counts = np.asarray(counts, dtype=np.int64)
+        route = np.repeat(np.arange(len(counts)), counts)
+        offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        index = np.arange(len(route)) - offsets
+        route_seeds = seeds[route]
+
+        airline = (uniform(route_seeds, index, STREAM_AIRLINE) * len(self.airline_names)).astype(np.int64)
+        number = 100 + (uniform(route_seeds, index, STREAM_NUMBER) * 900).astype(np.int64)
+        variation = self.variation(route_seeds, airline)
+        price = np.round(np.asarray(base_prices)[route] * self.airline_multipliers[airline] * variation, 2)
+        site = (uniform(route_seeds, index, STREAM_SITE) * self.num_sites).astype(np.int64)
+
+        return SimulatedFlights(
+            route=route,
+            airline=airline,
+            number=number,
+            price=price,
+            site=site,
+            itinerary=uniform(route_seeds, index, STREAM_ITINERARY),
+            option=uniform(route_seeds, index, STREAM_OPTION),
+            departure=FIRST_DEPARTURE_MIN + DEPARTURE_STEP_MIN * (
+                uniform(route_seeds, index, STREAM_DEPARTURE) * DEPARTURE_SLOTS
+            ).astype(np.int64),
+        )
+
+    def price_grid(self, seeds: np.ndarray, base_price: float) -> np.ndarray:
+        """Precios USD aerolíneas × rutas (p. ej. una ruta por día del calendario)"""
+        seeds = np.asarray(seeds, dtype=np.uint64)
+        airlines = np.arange(len(self.airline_names))
+        variation = self.variation(seeds[None, :], airlines[:, None])
+        return np.round(base_price * self.airline_multipliers[:, None] * variation, 2)
+
+    def price(self, seed: int, airline_name: str, base_price: float) -> float:
+        """Precio de una aerolínea concreta en una ruta"""
+        variation = self.variation(np.uint64(seed), np.uint64(self.airline_key(airline_name)))
+        multiplier = self.airline_multipliers[self._airline_index[airline_name]] \
+            if airline_name in self._airline_index else 1.0
+        return round(float(base_price * multiplier * variation), 2)
+
+    def pick(self, seed: int, index: int, stream: int, size: int) -> int:
+        """Elige de forma determinista un índice en [0, size)"""
+        return int(uniform(np.uint64(seed), np.uint64(index), stream) * size)
+
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Suscripciones en vivo al estado de vuelos por WebSocket
+Los clientes se suscriben a una ruta (origen-destino de hoy) o a un número
+de vuelo. Cada suscripción única tiene un solo sondeo al upstream, a un
+intervalo que reparte la cuota restante del mes entre las suscripciones
+activas, y solo se envían los cambios (estado, retraso, puerta...). El
+mensaje se codifica una vez para todos los suscriptores y cada cliente
+tiene un buffer de envío acotado: si no da abasto se le desconecta en vez
+de acumular memoria o frenar a los demás. Cuando se va el último
+suscriptor la suscripción se conserva al menos un intervalo más con su
+último estado, así que darse de baja y volver no dispara sondeos extra.
+"""
+
+import asyncio
+import calendar
+import re
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from serializacion import dumps
+
+# Campos de estado que se vigilan: nombre en la respuesta -> (sección, campo) de AviationStack
+STATUS_FIELDS = {
+    "estado": (None, "flight_status"),
+    "retraso_salida": ("departure", "delay"),
+    "retraso_llegada": ("arrival", "delay"),
+    "puerta_salida": ("departure", "gate"),
+    "puerta_llegada": ("arrival", "gate"),
+    "terminal_salida": ("departure", "terminal"),
+    "salida_estimada": ("departure", "estimated"),
+    "llegada_estimada": ("arrival", "estimated"),
+}
+
+FLIGHT_NUMBER = re.compile(r"^[A-Z0-9]{2,3}[0-9]{1,4}[A-Z]?$")
+
+# Clave de suscripción: ('ruta', origen, destino) o ('vuelo', numero_vuelo)
+SubscriptionKey = Tuple[str, ...]
+
+
+def subscription_id(key: SubscriptionKey) -> str:
+    """Identificador legible de la suscripción que viaja en los mensajes"""
+    return f"{key[0]}:{'-'.join(key[1:])}"
+
+
+def flight_status(record: dict) -> Tuple[str, dict]:
+    """(numero_vuelo, campos de estado) de un registro crudo de AviationStack"""
+    flight = record.get("flight") or {}
+    number = flight.get("iata") or f"{(record.get('airline') or {}).get('iata', 'XX')}{flight.get('number', '')}"
+    status = {}
+    for name, (section, field) in STATUS_FIELDS.items():
+        source = (record.get(section) or {}) if section else record
+        status[name] = source.get(field)
+    return number, status
+
+
+def diff_snapshots(old: Dict[str, dict], new: Dict[str, dict]) -> List[dict]:
+    """Cambios de `old` a `new`: campos cambiados, vuelos nuevos completos y vuelos eliminados"""
+    changes = []
+    for number, status in new.items():
+        previous = old.get(number)
+        if previous is None:
+            changes.append({"numero_vuelo": number, **status})
+            continue
+        changed = {name: value for name, value in status.items() if previous.get(name) != value}
+        if changed:
+            changes.append({"numero_vuelo": number, **changed})
+    for number in old.keys() - new.keys():
+        changes.append({"numero_vuelo": number, "eliminado": True})
+    return changes
+
+
+class LiveClient:
+    """Conexión de un cliente con su buffer de envío acotado"""
+
+    def __init__(self, websocket, buffer_size: int):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=buffer_size)
+        self.subscriptions: Set[SubscriptionKey] = set()
+        self.overflowed = False
+
+    def send(self, text: str) -> bool:
+        """Encola un mensaje ya codificado; si el buffer está lleno marca al cliente como lento"""
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # Se vacía el buffer para que el emisor vea enseguida la marca de cierre
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+    async def run_sender(self):
+        """Envía los mensajes del buffer hasta que el cliente se desborda"""
+        while True:
+            text = await self.queue.get()
+            if text is None:
+                await self.websocket.close(code=1013, reason="Cliente demasiado lento")
+                return
+            await self.websocket.send_text(text)
+
+
+class LiveSubscription:
+    """Una suscripción única: su sondeo, su último estado y sus suscriptores"""
+
+    def __init__(self, key: SubscriptionKey):
+        self.key = key
+        self.id = subscription_id(key)
+        self.subscribers: Set[LiveClient] = set()
+        self.snapshot: Optional[Dict[str, dict]] = None
+        self.task: Optional[asyncio.Task] = None
+        # Instante (monotonic) en que se fue el último suscriptor
+        self.idle_since = 0.0
+
+
+class LiveHub:
+    """Registro de suscripciones y sondeo compartido con intervalo según la cuota"""
+
+    def __init__(self, fetch_route: Callable[[str, str], Awaitable[Optional[List[dict]]]],
+                 fetch_flight: Callable[[str], Awaitable[Optional[List[dict]]]],
+                 quota: Callable[[], Tuple[int, int]],
+                 reserve: int = 20, min_interval: float = 60, max_interval: float = 3600,
+                 max_per_client: int = 20):
+        self.fetch_route = fetch_route
+        self.fetch_flight = fetch_flight
+        self.quota = quota
+        self.reserve = reserve
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_per_client = max_per_client
+        self.subscriptions: Dict[SubscriptionKey, LiveSubscription] = {}
+        self.clients = 0
+        self.polls = 0
+        self.polls_skipped = 0
+        self.messages_sent = 0
+        self.slow_clients = 0
+
+    def poll_interval(self, now: Optional[datetime] = None) -> float:
+        """Segundos entre sondeos para que la cuota restante llegue a fin de mes
+
+        `min_interval` es solo un suelo: si la cuota pide espaciar más los
+        sondeos manda la cuota. `max_interval` se usa cuando ya no queda cuota.
+        """
+        now = now or datetime.now()
+        used, limit = self.quota()
+        available = limit - used - self.reserve
+        if available <= 0:
+            return self.max_interval
+        month_end = datetime(now.year, now.month, calendar.monthrange(now.year, now.month)[1], 23, 59, 59)
+        interval = (month_end - now).total_seconds() * max(1, len(self.subscriptions)) / available
+        return max(self.min_interval, interval)
+
+    def subscribe(self, client: LiveClient, key: SubscriptionKey) -> Optional[str]:
+        """Añade el cliente a la suscripción; devuelve un motivo si se rechaza"""
+        if key in client.subscriptions:
+            return None
+        if len(client.subscriptions) >= self.max_per_client:
+            return f"Máximo {self.max_per_client} suscripciones por conexión"
+
+        subscription = self.subscriptions.get(key)
+        if subscription is None:
+            subscription = self.subscriptions[key] = LiveSubscription(key)
+            subscription.task = asyncio.create_task(self._poll(subscription))
+        subscription.subscribers.add(client)
+        client.subscriptions.add(key)
+
+        # Quien llega tarde recibe el último estado sin esperar al siguiente sondeo
+        if subscription.snapshot is not None:
+            self._deliver({client}, self._message("estado", subscription, list(subscription.snapshot.values())))
+        return None
+
+    def has_budget(self) -> bool:
+        """True si queda cuota por encima de la reserva para las búsquedas"""
+        used, limit = self.quota()
+        return limit - used > self.reserve
+
+    def unsubscribe(self, client: LiveClient, key: SubscriptionKey):
+        """Quita al cliente; tras la última baja el sondeo termina cuando le toca"""
+        client.subscriptions.discard(key)
+        subscription = self.subscriptions.get(key)
+        if subscription is None:
+            return
+        subscription.subscribers.discard(client)
+        if not subscription.subscribers:
+            subscription.idle_since = time.monotonic()
+
+    def disconnect(self, client: LiveClient):
+        """Da de baja todas las suscripciones de una conexión cerrada"""
+        for key in list(client.subscriptions):
+            self.unsubscribe(client, key)
+
+    async def close(self):
+        """Detiene todos los sondeos"""
+        tasks = [subscription.task for subscription in self.subscriptions.values()]
+        self.subscriptions.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _message(kind: str, subscription: LiveSubscription, flights: List[dict]) -> str:
+        return dumps({"tipo": kind, "suscripcion": subscription.id, "vuelos": flights}).decode("utf-8")
+
+    def _deliver(self, clients, text: str):
+        for client in list(clients):
+            if client.send(text):
+                self.messages_sent += 1
+            elif client.overflowed and client.subscriptions:
+                self.slow_clients += 1
+                self.disconnect(client)
+
+    async def _fetch(self, key: SubscriptionKey) -> Optional[List[dict]]:
+        if key[0] == "ruta":
+            return await self.fetch_route(key[1], key[2])
+        return await self.fetch_flight(key[1])
+
+    async def _poll(self, subscription: LiveSubscription):
+        while True:
+            if not subscription.subscribers:
+                # Sin suscriptores se conserva el último estado un intervalo más por si vuelven
+                interval = self.poll_interval()
+                idle = time.monotonic() - subscription.idle_since
+                if idle < interval:
+                    await asyncio.sleep(interval - idle)
+                    continue
+                if self.subscriptions.get(subscription.key) is subscription:
+                    del self.subscriptions[subscription.key]
+                return
+
+            if not self.has_budget():
+                # La reserva de cuota es para las búsquedas: no se sondea hasta el siguiente intervalo
+                self.polls_skipped += 1
+                await asyncio.sleep(self.poll_interval())
+                continue
+            try:
+                records = await self._fetch(subscription.key)
+            except Exception as e:
+                print(f"Error al sondear {subscription.id}: {e}")
+                records = None
+            self.polls += 1
+
+            # None es un sondeo fallido: se conserva el último estado en vez de dar los vuelos por eliminados
+            if records is not None:
+                snapshot = {}
+                for record in records:
+                    number, status = flight_status(record)
+                    snapshot[number] = {"numero_vuelo": number, **status}
+                if subscription.snapshot is None:
+                    self._deliver(subscription.subscribers,
+                                  self._message("estado", subscription, list(snapshot.values())))
+                else:
+                    changes = diff_snapshots(subscription.snapshot, snapshot)
+                    if changes:
+                        self._deliver(subscription.subscribers, self._message("cambios", subscription, changes))
+                subscription.snapshot = snapshot
+
+            await asyncio.sleep(self.poll_interval())
+
+    def stats(self) -> dict:
+        """Estado para /api-info"""
+        return {
+            "clients": self.clients,
+            "subscriptions": len(self.subscriptions),
+            "idle_subscriptions": sum(1 for s in self.subscriptions.values() if not s.subscribers),
+            "subscribers": sum(len(s.subscribers) for s in self.subscriptions.values()),
+            "polls": self.polls,
+            "polls_skipped": self.polls_skipped,
+            "poll_interval_seconds": round(self.poll_interval(), 1),
+            "messages_sent": self.messages_sent,
+            "slow_clients_disconnected": self.slow_clients,
+        }
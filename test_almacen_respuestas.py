@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Cuota compartida entre workers: varios procesos reservan a la vez sobre el
+mismo fichero SQLite y el total nunca supera el límite mensual.
+"""
+
+import multiprocessing
+
+from almacen_respuestas import ResponseStore
+
+MONTH = "2026-10"
+LIMIT = 100
+WORKERS = 8
+ATTEMPTS_PER_WORKER = 40
+
+
+def reserve_all(path: str, barrier, results):
+    """Worker: intenta reservar ATTEMPTS_PER_WORKER peticiones y devuelve las concedidas"""
+    store = ResponseStore(path)
+    barrier.wait()
+    counts = []
+    for _ in range(ATTEMPTS_PER_WORKER):
+        count = store.reserve_request(MONTH, LIMIT)
+        if count is not None:
+            counts.append(count)
+    results.put(counts)
+
+
+def test_shared_quota_never_exceeds_limit(tmp_path):
+    path = str(tmp_path / "vuelos_store.sqlite3")
+    store = ResponseStore(path)
+    store.open()
+    store.close()
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(WORKERS)
+    results = context.Queue()
+    workers = [context.Process(target=reserve_all, args=(path, barrier, results)) for _ in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    granted = [count for _ in workers for count in results.get(timeout=60)]
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    # Cada reserva concedida obtiene un contador distinto y ninguno pasa del límite
+    assert len(granted) == LIMIT
+    assert sorted(granted) == list(range(1, LIMIT + 1))
+    assert store.load_request_count(MONTH) == LIMIT
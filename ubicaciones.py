@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Resolución de ciudades y áreas metropolitanas a aeropuertos
+Un origen o destino puede ser un código IATA de aeropuerto, un código de
+área metropolitana (LON, NYC, PAR...) o el nombre de una ciudad, y
+opcionalmente un radio en km. El índice ciudad -> aeropuertos se calcula
+la primera vez que se resuelve una ciudad y el radio se resuelve sobre la
+rejilla espacial de distancias, sin recorrer toda la tabla.
+"""
+
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from aeropuertos_data import AirportTable
+from distancias import SpatialGrid
+from indice_aeropuertos import normalize
+
+# Códigos IATA de área metropolitana; solo cuentan los aeropuertos presentes en la tabla
+METRO_CODES = {
+    "LON": ["LHR", "LGW", "STN", "LTN", "LCY", "SEN"],
+    "NYC": ["JFK", "EWR", "LGA"],
+    "PAR": ["CDG", "ORY", "BVA"],
+    "MIL": ["MXP", "LIN", "BGY"],
+    "ROM": ["FCO", "CIA"],
+    "TYO": ["HND", "NRT"],
+    "OSA": ["KIX", "ITM", "UKB"],
+    "SEL": ["ICN", "GMP"],
+    "BJS": ["PEK", "PKX"],
+    "MOW": ["SVO", "DME", "VKO"],
+    "STO": ["ARN", "BMA", "NYO"],
+    "WAS": ["IAD", "DCA", "BWI"],
+    "CHI": ["ORD", "MDW"],
+    "YTO": ["YYZ", "YTZ"],
+    "SAO": ["GRU", "CGH", "VCP"],
+    "RIO": ["GIG", "SDU"],
+    "BUE": ["EZE", "AEP"],
+    "JKT": ["CGK", "HLP"],
+}
+
+
+class LocationResolver:
+    """Expande un código, área metropolitana o ciudad (más un radio) a aeropuertos"""
+
+    def __init__(self, airports: AirportTable, grid: Callable[[], SpatialGrid], max_airports: int = 6):
+        self.airports = airports
+        self.grid = grid
+        self.max_airports = max_airports
+        self._metros: Optional[Dict[str, List[str]]] = None
+        self._by_city: Optional[Dict[str, List[str]]] = None
+
+    @property
+    def metros(self) -> Dict[str, List[str]]:
+        if self._metros is None:
+            self._metros = {
+                metro: [code for code in codes if code in self.airports]
+                for metro, codes in METRO_CODES.items()
+            }
+        return self._metros
+
+    @property
+    def by_city(self) -> Dict[str, List[str]]:
+        if self._by_city is None:
+            by_city: Dict[str, List[str]] = {}
+            for code, city in zip(self.airports.codes, self.airports.cities):
+                if city:
+                    by_city.setdefault(normalize(city), []).append(code)
+            self._by_city = by_city
+        return self._by_city
+
+    def base_airports(self, location: str) -> List[str]:
+        """Aeropuertos que designa `location` sin aplicar radio"""
+        code = location.strip().upper()
+        if code in self.airports:
+            return [code]
+        if self.metros.get(code):
+            return list(self.metros[code])
+        return list(self.by_city.get(normalize(location), []))
+
+    def resolve(self, location: str, radius_km: Optional[float] = None) -> List[str]:
+        """Aeropuertos de `location` y, con radio, los cercanos ordenados por distancia"""
+        codes = self.base_airports(location)
+        if not codes or not radius_km:
+            return codes[:self.max_airports]
+
+        # Distancia de cada aeropuerto cercano al más próximo de los de partida
+        nearest: Dict[int, float] = {self.airports.id(code): 0.0 for code in codes}
+        for code in codes:
+            ids, distances = self.grid().within(self.airports.id(code), radius_km)
+            for i, distance in zip(ids.tolist(), distances.tolist()):
+                if distance < nearest.get(i, np.inf):
+                    nearest[i] = distance
+
+        ranked = sorted(nearest.items(), key=lambda item: (item[1], item[0]))
+        return [self.airports.codes[i] for i, _ in ranked[:self.max_airports]]
+
+    def stats(self) -> dict:
+        """Tamaño de los índices para /api-info (vacío mientras no se hayan construido)"""
+        if self._by_city is None:
+            return {"built": False, "max_airports": self.max_airports}
+        return {
+            "built": True,
+            "cities": len(self.by_city),
+            "multi_airport_cities": sum(1 for codes in self.by_city.values() if len(codes) > 1),
+            "metro_codes": sum(1 for codes in self.metros.values() if codes),
+            "max_airports": self.max_airports,
+        }